@@ -1,28 +1,57 @@
 import os
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-from flask import Flask, request, jsonify
+import logging
+from flask import Flask, Response, request, jsonify
 import yfinance as yf
 import pandas as pd
 from flask_cors import CORS
 import holidays
-import requests
-from stock_prediction_models import LSTM_ALGO
+from ohlcv_store import get_history, get_histories, get_recent_history
+from prediction_jobs import parse_stock_data, build_prediction_response, submit_job, get_job, stream_job
+from forecasting import forecast_tickers, MAX_HORIZON, MAX_TICKERS
+from ml_models import INFERENCE_URL, forecast_remote, get_lstm_algo, predict_remote, warm_up
+from fast_models import FAST_ALGO, FORECASTERS, select_model
+from sentiment import configure_shared_cache, score_headlines
+from scraper import get_news
+from quote_cache import quotes, index_key, get_quote, get_quotes
+from scheduler import PrefetchScheduler
+from quote_stream import QuoteHub, event_stream
+from pymongo import UpdateMany, UpdateOne
 from datetime import datetime
-from bs4 import BeautifulSoup
-from pymongo import MongoClient  
+from serialization import frame_response
+from indicators import compute_indicators
+from fundamentals_store import get_fundamentals_json, get_info_json
+from symbol_search import search_symbols
+from tax_engine import calculate_tax, read_trades, match_trades, summarize, frame_records
+from log_config import configure_logging
+from metrics import CONTENT_TYPE, init_app, render, track_upstream
+from db import db, watchlist, ensure_indexes_in_background, grouped_watchlists
 from datetime import datetime, timedelta
-from transformers import pipeline
-import traceback
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS
 
-client = MongoClient('localhost',27017)
+# Leveled logging (LOG_LEVEL, LOG_FORMAT) and per-route latency metrics
+configure_logging()
+init_app(app)
+logger = logging.getLogger(__name__)
 
-db=client.stocks
+# Prometheus-style metrics for this worker process
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
 
-watchlist=db.watchlist
+# FinBERT and TensorFlow load on first use; WARM_MODELS=1 preloads them in the background
+if os.environ.get('WARM_MODELS') == '1':
+    warm_up()
+
+# Indexes are created in the background so startup doesn't wait on Mongo
+ensure_indexes_in_background()
+
+# Headline sentiment and hot quotes shared by all workers
+configure_shared_cache(db.sentiment_cache)
+quotes.configure_shared(db.quote_cache)
 
 # stock indices homepage
 indian_tickers = {
@@ -43,12 +72,20 @@ indian_tickers = {
 }
 
 
+# Upper bound (seconds) for a single index fetch; slower symbols are reported as unavailable
+PRICE_FETCH_TIMEOUT = float(os.environ.get('PRICE_FETCH_TIMEOUT', 8))
+
+# Shared pool so every index is fetched concurrently instead of one after another
+price_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PRICE_FETCH_WORKERS', 12)))
+
+
 def fetch_prices(ticker_symbol):
     ticker = yf.Ticker(ticker_symbol)
     end_date = datetime.now()
     # Start 5 days back to ensure we cover weekends or holidays
     start_date = end_date - timedelta(days=5)
-    data = ticker.history(start=start_date, end=end_date)
+    with track_upstream('yfinance', 'history'):
+        data = ticker.history(start=start_date, end=end_date, timeout=PRICE_FETCH_TIMEOUT)
     
     # Drop any days where data is missing (e.g., weekends, holidays)
     data = data.dropna(subset=['Close'])
@@ -61,30 +98,113 @@ def fetch_prices(ticker_symbol):
     else:
         return None, None
 
+
+def fetch_index_prices(ticker_symbol):
+    """ [latest, previous] closes in a cacheable form, or None when unavailable. """
+    latest_close, previous_close = fetch_prices(ticker_symbol)
+    if latest_close is None:
+        return None  # not cached, so the next request tries again
+    return [float(latest_close), float(previous_close)]
+
+
+def fetch_cached_prices(ticker_symbol):
+    """ fetch_prices() through the shared quote cache, so each index is fetched once per TTL. """
+    prices = quotes.get_or_fetch(index_key(ticker_symbol), lambda: fetch_index_prices(ticker_symbol))
+    return tuple(prices) if prices else (None, None)
+
+
+def fetch_all_prices(symbols, timeout=PRICE_FETCH_TIMEOUT):
+    """
+    Fetch (latest, previous) closes for every symbol concurrently.
+    Symbols that fail or don't answer within `timeout` map to (None, None),
+    so one slow index never holds back the others.
+    """
+    futures = {symbol: price_executor.submit(fetch_cached_prices, symbol) for symbol in symbols}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for symbol, future in futures.items():
+        if not future.done():
+            # A running fetch can't be cancelled: it keeps its price_executor thread until
+            # the history call's own PRICE_FETCH_TIMEOUT, and its result still fills the cache
+            logger.warning("Timed out fetching prices", extra={'symbol': symbol})
+            results[symbol] = (None, None)
+            continue
+        try:
+            results[symbol] = future.result()
+        except Exception as e:
+            logger.warning("Error fetching prices: %s", e, extra={'symbol': symbol})
+            results[symbol] = (None, None)
+    return results
+
+# Warm index prices, watchlisted quotes and daily bars in the background during market hours
+if os.environ.get('PREFETCH') == '1':
+    PrefetchScheduler(watchlist, indian_tickers.values(), fetch_index_prices).start()
+
+def index_summary(latest_price, previous_price):
+    if latest_price is not None and previous_price is not None:
+        change = latest_price - previous_price
+        percent_change = (change / previous_price) * 100
+        return {
+            'latest': round(latest_price, 2),
+            'previous': round(previous_price, 2),
+            'change': round(change, 2),
+            'percent_change': round(percent_change, 2),
+        }
+    return {
+        'latest': 'Data not available',
+        'previous': 'Data not available',
+        'change': 'Data not available',
+        'percent_change': 'Data not available',
+    }
+
 @app.route('/latest-prices', methods=['GET'])
 def latest_prices():
     prices = {}
+    all_prices = fetch_all_prices(indian_tickers.values())
     for name, symbol in indian_tickers.items():
-        latest_price, previous_price = fetch_prices(symbol)
-        if latest_price is not None and previous_price is not None:
-            change = latest_price - previous_price
-            percent_change = (change / previous_price) * 100
-            prices[name] = {
-                'latest': round(latest_price, 2),
-                'previous': round(previous_price, 2),
-                'change': round(change, 2),
-                'percent_change': round(percent_change, 2),
-            }
-        else:
-            prices[name] = {
-                'latest': 'Data not available',
-                'previous': 'Data not available',
-                'change': 'Data not available',
-                'percent_change': 'Data not available',
-            }
+        prices[name] = index_summary(*all_prices[symbol])
     return jsonify(prices)
 
 
+# Streaming quotes: one upstream poll per ticker/index, changes pushed to every subscriber
+quote_hub = QuoteHub({
+    'quote': lambda ticker: dict(zip(('current_price', 'percentage'), get_quote(ticker))),
+    'index': lambda name: index_summary(*fetch_cached_prices(indian_tickers[name])),
+})
+
+# Each open stream holds a server thread; keep this below the worker's thread count (see gunicorn.conf.py)
+MAX_STREAMS = int(os.environ.get('MAX_STREAMS', 16))
+# Every subscribed ticker is polled upstream each interval, so one stream can't ask for many
+MAX_STREAM_TICKERS = int(os.environ.get('MAX_STREAM_TICKERS', 20))
+
+@app.route('/stream/quotes', methods=['GET'])
+def stream_quotes():
+    tickers = list(dict.fromkeys(t for t in request.args.get('tickers', '').split(',') if t))
+    indices = [i for i in request.args.get('indices', '').split(',') if i]
+
+    if len(tickers) > MAX_STREAM_TICKERS:
+        return jsonify({'error': f'At most {MAX_STREAM_TICKERS} tickers per stream'}), 400
+
+    unknown = [i for i in indices if i not in indian_tickers]
+    if unknown:
+        return jsonify({'error': f"Unknown indices: {', '.join(unknown)}"}), 400
+    if not tickers and not indices:
+        return jsonify({'error': 'Provide tickers and/or indices to subscribe to'}), 400
+
+    if quote_hub.subscriber_count() >= MAX_STREAMS:
+        # Clients fall back to polling; the threads are kept for ordinary requests
+        return jsonify({'error': 'Too many open streams, try again later'}), 503, {'Retry-After': '30'}
+
+    keys = [('quote', t) for t in tickers] + [('index', i) for i in indices]
+    subscription = quote_hub.subscribe(keys)
+    return Response(
+        event_stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 
 
 # for Individual-stock/price and stock comparision
@@ -97,14 +217,101 @@ def stock_data():
     if not ticker or not start_date or not end_date:
         return jsonify({'error': 'Missing parameters'}), 400
 
-    data = yf.download(ticker, start=start_date, end=end_date)
-    print(data)
+    data = get_history(ticker, start_date, end_date)
     
     if data.empty:
         return jsonify({'error': 'No data found for ticker'}), 404
     
     data = data.reset_index()
-    return data.to_json(orient='records')
+    try:
+        # Records by default; ?format=columnar|msgpack|arrow (or Accept) for compact payloads
+        return frame_response(data, lambda: data.to_json(orient='records'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+# Stock comparison: several tickers over one range, aligned on their common dates
+MAX_BATCH_TICKERS = int(os.environ.get('MAX_BATCH_TICKERS', 20))
+
+@app.route('/stock-data-batch', methods=['GET'])
+def stock_data_batch():
+    tickers = list(dict.fromkeys(t for t in request.args.get('tickers', '').split(',') if t))
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+
+    if not tickers or not start_date or not end_date:
+        return jsonify({'error': 'Missing parameters'}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({'error': f'At most {MAX_BATCH_TICKERS} tickers per request'}), 400
+
+    try:
+        histories = get_histories(tickers, start_date, end_date)
+        found = [t for t in tickers if not histories[t].empty]
+        if not found:
+            return jsonify({'error': 'No data found for tickers'}), 404
+
+        # Inner join on dates so every series lines up row for row
+        panel = pd.concat({t: histories[t] for t in found}, axis=1, join='inner').sort_index()
+        closes = panel.xs('Close', axis=1, level=1)
+
+        response = {
+            'dates': panel.index.strftime('%Y-%m-%d').tolist(),
+            'tickers': found,
+            'missing': [t for t in tickers if t not in found],
+            'series': {
+                t: {column: panel[t][column].astype(object).where(panel[t][column].notna(), None).tolist()
+                    for column in panel[t].columns}
+                for t in found
+            },
+        }
+        if request.args.get('normalize') in ('1', 'true'):
+            # Cumulative return (%) since the first common date
+            normalized = (closes / closes.iloc[0] - 1) * 100
+            response['normalized'] = {t: normalized[t].round(4).tolist() for t in found}
+        if request.args.get('correlation') in ('1', 'true'):
+            corr = closes.pct_change().corr()
+            response['correlation'] = {
+                'tickers': found,
+                'matrix': corr.round(4).astype(object).where(corr.notna(), None).values.tolist(),
+            }
+        return jsonify(response)
+    except Exception as e:
+        logger.exception("Error fetching batch stock data", extra={'tickers': tickers})
+        return jsonify({'error': str(e)}), 500
+
+# Technical indicators computed server-side, e.g. ?indicators=sma:50,ema:20,rsi,macd:12:26:9
+@app.route('/indicators', methods=['GET'])
+def get_indicators():
+    ticker = request.args.get('ticker')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    specs = [s for s in request.args.get('indicators', '').split(',') if s.strip()]
+
+    if not ticker or not start_date or not end_date or not specs:
+        return jsonify({'error': 'Missing parameters'}), 400
+
+    try:
+        results = compute_indicators(ticker, specs, start_date, end_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error computing indicators", extra={'ticker': ticker})
+        return jsonify({'error': str(e)}), 500
+
+    frames = {label: frame for label, frame in results.items() if not frame.empty}
+    if not frames:
+        return jsonify({'error': 'No data found for ticker'}), 404
+
+    # One shared date axis; each indicator maps its output columns to aligned arrays
+    panel = pd.concat(frames, axis=1).sort_index()
+    return jsonify({
+        'ticker': ticker,
+        'dates': panel.index.strftime('%Y-%m-%d').tolist(),
+        'indicators': {
+            label: {column: panel[label][column].astype(object).where(panel[label][column].notna(), None).tolist()
+                    for column in panel[label].columns}
+            for label in frames
+        },
+    })
 
 # individual-stock/Fundamentals
 @app.route('/fundamental-data', methods=['GET'])
@@ -114,34 +321,12 @@ def get_fundamental_data():
         return jsonify({"error": "Ticker parameter is required"}), 400
 
     try:
-        ticker_info = yf.Ticker(ticker)
-        balance_sheet,income_statement,cash_flow=get_fundamentals(ticker_info)
-        data = {
-            "b":{"balance_sheet": balance_sheet},
-            "i":{"income_statement": income_statement},
-            "c":{"cash_flow": cash_flow}
-        }
-        return jsonify(data)
+        # Pre-serialized body from the fundamentals store; refreshed in the background
+        return Response(get_fundamentals_json(ticker), mimetype='application/json')
     except Exception as e:
-        print(f"Error: {e}")
+        logger.exception("Error fetching fundamentals", extra={'ticker': ticker})
         return jsonify({"error": str(e)}), 500
 
-def df_to_dict(df):
-    """ Convert DataFrame to dictionary, with timestamps as strings. """
-    if isinstance(df, pd.DataFrame):
-        # Convert index and columns to string if they are timestamps
-        df.index = df.index.astype(str)
-        df.columns = df.columns.astype(str)
-        # Convert DataFrame to dictionary
-        return df.to_dict()
-    return {}
-
-def get_fundamentals(ticker):
-    balance_sheet = df_to_dict(ticker.balance_sheet.fillna("null")) 
-    income_statement = df_to_dict(ticker.financials.fillna("null")) 
-    cash_flow = df_to_dict(ticker.cashflow.fillna("null"))  
-    return balance_sheet, income_statement, cash_flow  
-
 
 # individual-stock/stock-info
 @app.route('/stock-info', methods=['GET'])
@@ -151,20 +336,17 @@ def get_stock_info():
         return jsonify({"error": "Ticker is required"}), 400
     
     try:
-        ticker = yf.Ticker(ticker_i)
-        info = ticker.info
-        
-        if not info:
+        info = get_info_json(ticker_i)
+        if info is None:
             return jsonify({"error": "No info found for ticker"}), 404
-        
-        return jsonify(info)
+
+        return Response(info, mimetype='application/json')
     except Exception as e:
-        print(f"Error: {e}")  # Log the error to console
+        logger.exception("Error fetching stock info", extra={'ticker': ticker_i})
         return jsonify({"error": str(e)}), 500
     
 
 
-sentiment_pipeline = pipeline("text-classification", model="ProsusAI/finbert")
 # NEWS
 @app.route('/stock-news1', methods=['GET'])
 def stock_news():
@@ -172,54 +354,15 @@ def stock_news():
     if ticker_symbol:
         news_data = get_news(ticker_symbol)
         
-        # Perform sentiment analysis on each news item
-        for item in news_data:
-            try:
-                sentiment_result = sentiment_pipeline(item["news"])[0]  # Get first result
-                item["sentiment"] = (sentiment_result["label"])
-                print(f"News: {item['news']}")
-                print(f"Sentiment Result: {sentiment_result}")
-                print(f"Mapped Sentiment: {item['sentiment']}")
-                print("-" * 50)
-            except Exception as e:
-                print(f"Error analyzing sentiment: {e}")
-                item["sentiment"] = "Neutral"  # Default sentiment
+        # Score all headlines in one batched call; cached headlines skip inference
+        sentiments = score_headlines([item["news"] for item in news_data])
+        for item, sentiment in zip(news_data, sentiments):
+            item["sentiment"] = sentiment
         
         return jsonify(news_data)
     else:
         return jsonify({"error": "Ticker symbol is required"}),400
 
-def get_news(ticker):
-    if ticker.endswith('.NS'):
-        ticker = ticker[:-3]
-    url = f"https://www.google.com/finance/quote/{ticker}:NSE?hl=en"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    class1 = 'z4rs2b'
-
-    # Find all news items with the specified class
-    news_items = soup.findAll(class_=class1)
-    
-    news_data = []
-    
-    for item in news_items:
-        link = item.find('a', href=True)
-        source = item.find(class_="sfyJob")
-        time = item.find(class_="Adak")
-        new = item.find(class_="Yfwt5")
-        
-        if link and source and time and new:
-            news_link = link['href']
-            news_data.append({
-                "source": source.text,
-                "time": time.text,
-                "news": new.text.strip(),
-                "link": news_link
-            })
-    
-    return news_data
-
-
 # holidays
 @app.route('/holidays', methods=['GET'])
 def get_holidays():
@@ -243,31 +386,50 @@ def get_holidays():
         return jsonify({'error': 'Country not supported'}), 400
 
 
+# Instrument typeahead over the NSE code list, e.g. ?q=tata mot&limit=10&offset=0
+MAX_SEARCH_LIMIT = int(os.environ.get('MAX_SEARCH_LIMIT', 50))
+
+@app.route('/search-symbols', methods=['GET'])
+def search_symbols_route():
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if not 1 <= limit <= MAX_SEARCH_LIMIT or offset < 0:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_LIMIT} and offset non-negative'}), 400
+
+    try:
+        total, results = search_symbols(query, limit=limit, offset=offset)
+    except Exception as e:
+        logger.exception("Error searching symbols", extra={'query': query})
+        return jsonify({'error': str(e)}), 500
+
+    next_offset = offset + len(results)
+    response = jsonify({
+        'query': query,
+        'total': total,
+        'offset': offset,
+        'results': results,
+        'next_offset': next_offset if next_offset < total else None,
+    })
+    # The code list only changes with a deploy, so let browsers reuse answers
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
 # Watchlist
 @app.route('/get-watchlist', methods=['GET'])
 def get_watchlist():
     user_id = request.args.get('userId')
-    print(user_id)
 
     if not user_id:
         return jsonify({'error': 'User ID parameter is required'}), 400
 
     try:
-        # Find all watchlists for the user
-        watchlist_items = watchlist.find({"UserId": user_id})
-        watchlist_data = list(watchlist_items)
-        
-        # Group watchlist items by their names
-        grouped_watchlists = {}
-        for item in watchlist_data:
-            item['_id'] = str(item['_id'])  # Convert ObjectId to string
-            list_name = item.get('Watchlist')
-            if list_name not in grouped_watchlists:
-                grouped_watchlists[list_name] = {'name': list_name, 'items': []}
-            grouped_watchlists[list_name]['items'].append(item)
-        
-        # Convert grouped data to list
-        response_data = list(grouped_watchlists.values())
+        # Grouped by watchlist name server-side, with only the fields the page needs
+        response_data = grouped_watchlists(user_id)
         
         return jsonify(response_data)
     except Exception as e:
@@ -313,12 +475,9 @@ def remove_stock():
         # Find the document matching the watchlist name and stock symbol
         watchlist_item = watchlist.find_one(query)
 
-        # Debug: Print the fetched item to verify the correct one is found
-        print("Fetched Watchlist Item:", watchlist_item)
-
         # If the item is not found, return an error
         if not watchlist_item:
-            print(f"Stock symbol '{stock_symbol}' not found in the watchlist '{watchlist_name}'.")
+            logger.info("Stock not found in watchlist", extra={'stock': stock_symbol, 'watchlist': watchlist_name})
             return jsonify({'error': 'Stock not found in the specified watchlist'}), 404
 
         # Remove the document from the collection
@@ -328,11 +487,10 @@ def remove_stock():
         if result.deleted_count == 0:
             return jsonify({'error': 'Failed to remove stock'}), 500
 
-        print(f"Deleted count after removal: {result.deleted_count}")
         return jsonify({'message': 'Stock removed successfully'}), 200
 
     except Exception as e:
-        print(f"Error removing stock: {e}")
+        logger.exception("Error removing stock", extra={'stock': stock_symbol, 'watchlist': watchlist_name})
         return jsonify({'error': str(e)}), 500
 
 
@@ -352,138 +510,185 @@ def current_price():
    
 
     try:
-        # Fetch the current price using your scrap function
-        price, percentage = scrap(ticker)
-
-
+        # Fetch the current price, shared with other users through the quote cache
+        price, percentage = get_quote(ticker)
 
-        # Log the information being queried for debugging
-        print(f"Checking for stock in watchlist: {watchlist_name}, ticker: {ticker}, userId: {userId}")
-
-        # Step 1: Check if the stock already exists in the user's watchlist
-        existing_stock = watchlist.find_one({
-            'UserId': userId,
-            'Watchlist': watchlist_name,
-            'Stock': ticker
-        })
-
-        if existing_stock:
-            # Step 2: Update the stock's price if it already exists
-            print(f"Stock found: {ticker}, updating price: {price}")
-            watchlist.update_one(
-                {'_id': existing_stock['_id']},
-                {'$set': {'Price': price}}
-            )
-        else:
-            # Step 3: Insert new stock if it doesn't exist
-            print(f"Stock not found, inserting new stock: {ticker} in watchlist: {watchlist_name}")
-            watchlist.insert_one({
-                'Watchlist': watchlist_name,
-                'stockName': stockName,
-                'Stock': ticker,
-                'Price': price,
-                "UserId": userId
-            })
+        # Update the stock's price, or insert it if it isn't in the watchlist yet,
+        # in a single round trip on the (UserId, Watchlist, Stock) index
+        watchlist.update_one(
+            {'UserId': userId, 'Watchlist': watchlist_name, 'Stock': ticker},
+            {'$set': {'Price': price}, '$setOnInsert': {'stockName': stockName}},
+            upsert=True,
+        )
 
         return jsonify({'ticker': ticker, 'current_price': price})
     except Exception as e:
-        print(f"Error: {e}")
+        logger.exception("Error fetching current price", extra={'ticker': ticker})
         return jsonify({'error': str(e)}), 500
 
 
+# Refresh every price in a user's watchlists (or one of them) in one go
+@app.route('/refresh-watchlist', methods=['POST'])
+def refresh_watchlist():
+    data = request.get_json() or {}
+    user_id = data.get('userId')
+    watchlist_name = data.get('watchlist_name')
+    # Optional stocks to add to `watchlist_name` while refreshing: [{"ticker", "stockName"}]
+    new_items = data.get('items') or []
 
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    if new_items and not watchlist_name:
+        return jsonify({'error': 'Watchlist name is required when adding items'}), 400
 
-def scrap(ticker):
-    url = f'https://www.google.com/finance/quote/{ticker}:NSE'
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception('Failed to fetch data from Google Finance')
-    
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Extract current price
-    class1 = 'YMlKec fxKbKc'
-    price_element = soup.find(class_=class1)
-    if price_element:
-        price = price_element.text.strip()[1:].replace(",", "")
-        try:
-            price = float(price)
-        except ValueError:
-            raise Exception('Failed to parse price')
-    else:
-        raise Exception('Price element not found')
-    
-    # Extract percentage change
-    class2 = "JwB6zf"
-    percentage_element = soup.find(class_=class2)
-    if percentage_element:
-        percentage = percentage_element.text
- # Remove the '%' sign
-    else:
-        raise Exception('Percentage element not found')
-    
-    return price, percentage
-
+    try:
+        query = {'UserId': user_id}
+        if watchlist_name:
+            query['Watchlist'] = watchlist_name
+        existing = watchlist.distinct('Stock', query)
+
+        # Each ticker is scraped once even if it sits in several watchlists
+        tickers = set(existing) | {item['ticker'] for item in new_items if item.get('ticker')}
+        prices_by_ticker, errors = get_quotes(tickers)
+
+        operations = []
+        for ticker, (price, _) in prices_by_ticker.items():
+            if ticker in existing:
+                operations.append(UpdateMany({**query, 'Stock': ticker}, {'$set': {'Price': price}}))
+        for item in new_items:
+            ticker = item.get('ticker')
+            if ticker in prices_by_ticker and ticker not in existing:
+                operations.append(UpdateOne(
+                    {'UserId': user_id, 'Watchlist': watchlist_name, 'Stock': ticker},
+                    {'$set': {'Price': prices_by_ticker[ticker][0]}, '$setOnInsert': {'stockName': item.get('stockName')}},
+                    upsert=True,
+                ))
+
+        updated = inserted = 0
+        if operations:
+            result = watchlist.bulk_write(operations, ordered=False)
+            updated, inserted = result.modified_count, result.upserted_count
+
+        prices = {ticker: {'current_price': price, 'percentage': percentage} for ticker, (price, percentage) in prices_by_ticker.items()}
+        prices.update({ticker: {'error': error} for ticker, error in errors.items()})
+        return jsonify({'prices': prices, 'updated': updated, 'inserted': inserted})
+    except Exception as e:
+        logger.exception("Error refreshing watchlist", extra={'user_id': user_id})
+        return jsonify({'error': str(e)}), 500
 
 
 # Predictions
+PREDICTION_MODELS = ('lstm', *FORECASTERS, 'auto')
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         data = request.json
-        if 'stockData' not in data:
-            return jsonify({"error": "Missing 'stockData' in request"}), 400
+        # 'lstm' (default), one of the CPU fast-path models, or 'auto' to pick the cheapest accurate one
+        model = (data or {}).get('model') or 'lstm'
+        if model not in PREDICTION_MODELS:
+            return jsonify({"error": f"Unknown model '{model}', expected one of {', '.join(PREDICTION_MODELS)}"}), 400
 
-        # Validate data
-        stock_data = pd.DataFrame(data['stockData'])
-        if not all(col in stock_data.columns for col in ['Date', 'Close']):
-            return jsonify({"error": "Required columns 'Date' and 'Close' are missing or misnamed"}), 400
+        if INFERENCE_URL and model == 'lstm':
+            # Training/inference happens on the shared inference worker
+            body, status = predict_remote(data)
+            return jsonify(body), status
 
-        # Ensure Date is in datetime format
-        stock_data['Date'] = pd.to_datetime(stock_data['Date'], errors='coerce')
-        if stock_data['Date'].isnull().any():
-            return jsonify({"error": "Invalid Date values in data"}), 400
+        try:
+            stock_data = parse_stock_data(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if model == 'auto':
+            model = select_model(data.get('ticker'), stock_data)['model']
+            if INFERENCE_URL and model == 'lstm':
+                body, status = predict_remote(data)
+                return jsonify(body), status
 
-        # Run LSTM Model
         try:
-            lstm_prediction, lstm_error, df1, df2 = LSTM_ALGO(stock_data)
-            lstm_prediction = float(lstm_prediction)
-            lstm_error = str(lstm_error) if lstm_error else None
+            if model == 'lstm':
+                LSTM_ALGO = get_lstm_algo()
+                # Client-supplied data: stored models are used but never replaced from it
+                prediction, error, df1, df2 = LSTM_ALGO(stock_data, ticker=data.get('ticker'), store=False)
+            else:
+                prediction, error, df1, df2 = FAST_ALGO(stock_data, model=model)
         except Exception as e:
-            print("LSTM error:", traceback.format_exc())
+            logger.exception("Prediction model error", extra={'model': model})
             return jsonify({"error": str(e)}), 500
 
-        # Convert data for JSON response
-        actual_data = df1.get("Actual Data", []).tolist()
-        predicted_data = df1.get("Predicted", []).tolist()
-        
-        # Handle df2 as a NumPy array
-        if isinstance(df2, np.ndarray):
-            volume_data = df2.flatten().tolist()  # Flatten the NumPy array and convert to list
-        else:
-            volume_data = df2.values.flatten().tolist()  # Fallback for Pandas DataFrame
-
-        response = {
-            "LSTM": {"prediction": lstm_prediction, "error": lstm_error},
-            "original": {
-                "dates": stock_data['Date'].dt.strftime('%Y-%m-%d').tolist(),
-                "prices": stock_data['Close'].tolist()
-            },
-            "comparision": {
-                "Actual": actual_data,
-                "Predicted": predicted_data
-            },
-            "Volume": {
-                "df2": volume_data
-            }
-        }
+        # Same shape whichever model ran (the "LSTM" key is what the frontend reads)
+        return jsonify({**build_prediction_response(stock_data, prediction, error, df1, df2), "model": model})
 
-        return jsonify(response)
+    except Exception as e:
+        logger.exception("Error during prediction")
+        return jsonify({"error": str(e)}), 500
 
+# Prediction jobs: submit, then poll or stream progress instead of blocking a worker
+@app.route('/predict/jobs', methods=['POST'])
+def submit_prediction_job():
+    try:
+        job, deduplicated = submit_job(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("Error during prediction:", traceback.format_exc())
+        logger.exception("Error submitting prediction job")
         return jsonify({"error": str(e)}), 500
+
+    return jsonify({"job_id": job['id'], "status": job['status'], "deduplicated": deduplicated}), 202
+
+@app.route('/predict/jobs/<job_id>', methods=['GET'])
+def prediction_job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/predict/jobs/<job_id>/stream', methods=['GET'])
+def prediction_job_stream(job_id):
+    if get_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    return Response(stream_job(job_id), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
         
+# Multi-ticker, multi-day forecasts from the stored models
+@app.route('/forecast', methods=['POST'])
+def forecast():
+    data = request.get_json() or {}
+    tickers = data.get('tickers') or []
+    if not tickers:
+        return jsonify({"error": "'tickers' is required"}), 400
+    if len(tickers) > MAX_TICKERS:
+        return jsonify({"error": f"At most {MAX_TICKERS} tickers per request"}), 400
+
+    try:
+        horizon = int(data.get('horizon', 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid horizon"}), 400
+    if not 1 <= horizon <= MAX_HORIZON:
+        return jsonify({"error": f"horizon must be between 1 and {MAX_HORIZON}"}), 400
+
+    try:
+        if INFERENCE_URL:
+            # The stored models are loaded and run on the shared inference worker
+            results = forecast_remote(tickers, horizon)
+        else:
+            results = forecast_tickers(tickers, horizon)
+
+        # Optionally queue training for tickers that don't have a model yet
+        if data.get('train_missing'):
+            for ticker, result in results.items():
+                if result.get('error') != 'No trained model for ticker':
+                    continue
+                history = get_recent_history(ticker).reset_index()
+                history['Date'] = history['Date'].dt.strftime('%Y-%m-%d')
+                # Trained on history fetched here, so the model is saved for /forecast
+                job, _ = submit_job({'stockData': history.to_dict(orient='records'), 'ticker': ticker}, store=True)
+                result['job_id'] = job['id']
+
+        return jsonify({"horizon": horizon, "forecasts": results})
+    except Exception as e:
+        logger.exception("Error during forecast")
+        return jsonify({"error": str(e)}), 500
+
 # Prediction data
 @app.route('/stock-data1', methods=['GET'])
 def get_stock_data():
@@ -492,97 +697,30 @@ def get_stock_data():
         return jsonify({"error": "Ticker is required"}), 400
 
     try:
-        end = datetime.now()
-        start = datetime(end.year - 2, end.month, end.day)
-        data = yf.download(ticker, start=start, end=end)
+        data = get_recent_history(ticker)
 
         if data.empty:
             return jsonify({"error": "No data found for ticker"}), 404
 
-        # Flatten multi-index columns (if any)
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = ['_'.join([str(c) for c in col]) for col in data.columns]
-
         # Reset index to include 'Date' as a column
-        data.reset_index(inplace=True)
-
-        # Rename columns to remove the ticker suffix (e.g., "Close_ADANIENT.NS" -> "Close")
-        data.columns = [col.replace(f"_{ticker}", "") for col in data.columns]
+        data = data.reset_index()
 
         # Format 'Date' column as strings
         data['Date'] = data['Date'].dt.strftime('%Y-%m-%d')
 
-        # Convert to list of dictionaries
-        data_dict = data.to_dict(orient='records')
-        print("Processed data:", data_dict)  # Log the processed data
-
-        return jsonify(data_dict)
+        # Records by default; ?format=columnar|msgpack|arrow (or Accept) for compact payloads
+        return frame_response(data, lambda: app.json.dumps(data.to_dict(orient='records')))
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("Error:", e)
+        logger.exception("Error fetching prediction data", extra={'ticker': ticker})
         return jsonify({"error": str(e)}), 500
 
 
 # model locally (Download a GGUF model file from Hugging Face)
 #llm = Llama(model_path="llama-2-7b.gguf")  # Adjust based on your model
 
-# Sample Tax Rules (India-based)
-# Tax rules
-TAX_RULES = {
-    "short_term": 0.20,  # 20% tax for short-term gains
-    "long_term": 0.125,  # 12.5% tax for long-term gains
-}
-
-# Function to categorize gains as short-term or long-term
-def categorize_tax(transaction):
-    """
-    Categorize a transaction as short-term or long-term based on the holding period.
-    """
-    buy_date = pd.to_datetime(transaction["buy_date"])
-    sell_date = pd.to_datetime(transaction["sell_date"])
-    holding_period = (sell_date - buy_date).days
-    return "short_term" if holding_period <= 365 else "long_term"
-
-# Function to calculate tax liability
-def calculate_tax(portfolio):
-    """
-    Calculate the total tax liability and a breakdown of taxes for each transaction.
-    """
-    total_tax = 0
-    tax_breakdown = []
-    
-    for transaction in portfolio:
-        try:
-            # Validate transaction data
-            if not all(key in transaction for key in ["symbol", "buy_price", "sell_price", "quantity", "buy_date", "sell_date"]):
-                raise ValueError("Invalid transaction data")
-            
-            # Categorize the transaction
-            category = categorize_tax(transaction)
-            
-            # Calculate gain
-            gain = (transaction["sell_price"] - transaction["buy_price"]) * transaction["quantity"]
-            
-            # Calculate tax amount
-            if category == "short_term" and gain <= 125000:
-                tax_amount = 0  # Exempt short-term gains below ₹125,000
-            else:
-                tax_amount = gain * TAX_RULES[category] if gain > 0 else 0
-            
-            # Update total tax and tax breakdown
-            total_tax += tax_amount
-            tax_breakdown.append({
-                "symbol": transaction["symbol"], 
-                "gain": gain, 
-                "tax_category": category, 
-                "tax_amount": tax_amount
-            })
-        except Exception as e:
-            logging.error(f"Error processing transaction: {transaction}. Error: {e}")
-            continue
-    
-    return total_tax, tax_breakdown
-
 @app.route("/calculate-tax", methods=["POST"])
 def tax_calculation():
     """
@@ -601,7 +739,49 @@ def tax_calculation():
             "tax_details": tax_details
         })
     except Exception as e:
-        
+        logger.exception("Error calculating tax")
+        return jsonify({"error": "An error occurred while calculating tax"}), 500
+
+# Raw buy/sell trade streams (e.g. broker exports), FIFO-matched per symbol
+MAX_TAX_TRADES = int(os.environ.get('MAX_TAX_TRADES', 200000))
+
+@app.route("/calculate-tax/trades", methods=["POST"])
+def tax_from_trades():
+    """
+    Tax liability for unmatched trades, uploaded as a CSV/JSON file ('file' form
+    field), a JSON body {"trades": [...]}, or a raw CSV body. Columns: symbol,
+    side (buy/sell), quantity, price, date. ?lots=0 leaves out the per-lot detail.
+    """
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            trades = read_trades(upload.read(), upload.filename)
+        elif request.is_json:
+            trades = read_trades((request.get_json() or {}).get("trades", []))
+        else:
+            trades = read_trades(request.get_data())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if trades.empty:
+        return jsonify({"error": "No trades provided"}), 400
+    if len(trades) > MAX_TAX_TRADES:
+        return jsonify({"error": f"At most {MAX_TAX_TRADES} trades per upload"}), 400
+
+    try:
+        lots, open_positions, errors = match_trades(trades)
+        total_tax, summary = summarize(lots)
+        response = {
+            "total_tax": total_tax,
+            "summary": frame_records(summary),
+            "open_positions": frame_records(open_positions, ["date"]),
+            "errors": errors,
+        }
+        if request.args.get("lots") not in ("0", "false"):
+            response["lots"] = frame_records(lots, ["buy_date", "sell_date"])
+        return jsonify(response)
+    except Exception as e:
+        logger.exception("Error matching trades")
         return jsonify({"error": "An error occurred while calculating tax"}), 500
     
 
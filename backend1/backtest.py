@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from windowing import LOOKBACK, FEATURES, make_supervised
+
+# Walk-forward evaluation of the forecasting models. Each ticker's history is cut
+# into consecutive folds: train on a window of bars, predict the next `test_size`
+# bars one step ahead, then roll forward by `step` bars. The model is trained
+# from scratch on the first fold only; every later fold warm-starts from the
+# previous fold's weights and is fitted on just the bars added since, so a
+# ticker with dozens of folds costs about one full training. Tickers run in
+# parallel worker processes. Per-fold errors (and a naive last-close baseline)
+# are returned so model quality can be audited over time and across tickers.
+#
+#   python backtest.py RELIANCE.NS TCS.NS --years 5 --workers 4 --out data/backtests/nightly
+#   python backtest.py --universe nse_tickers.txt --model lstm
+#   python backtest.py RELIANCE.NS --model ridge      # or exp_smoothing (see fast_models.py)
+BACKTEST_DIR = os.environ.get('BACKTEST_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'backtests'))
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+TRAIN_SIZE = 500  # bars in each training window (about two years)
+TEST_SIZE = 20    # bars predicted per fold (about a month)
+
+
+def get_forecaster(name, lookback, n_features):
+    """ A fresh forecaster with fit(X, y, warm_start) / predict(X) on scaled windows. """
+    if name == 'lstm':
+        from stock_prediction_models import LSTMForecaster
+        return LSTMForecaster(lookback=lookback, n_features=n_features)
+    from fast_models import get_fast_forecaster
+    return get_fast_forecaster(name, lookback=lookback, n_features=n_features)
+
+
+def fold_bounds(n_rows, lookback, train_size=TRAIN_SIZE, test_size=TEST_SIZE, step=None, expanding=False):
+    """
+    [(train_start, train_end, test_start, test_end)] as row indices of the
+    predicted bars; bars before `lookback` can't be predicted (no full window).
+    """
+    step = step or test_size
+    folds = []
+    test_start = lookback + train_size
+    while test_start + test_size <= n_rows:
+        train_start = lookback if expanding else test_start - train_size
+        folds.append((train_start, test_start, test_start, test_start + test_size))
+        test_start += step
+    return folds
+
+
+def _inverse(sc, values):
+    return (np.asarray(values) - sc.min_[0]) / sc.scale_[0]
+
+
+def walk_forward(df, model='lstm', lookback=LOOKBACK, features=FEATURES, train_size=TRAIN_SIZE, test_size=TEST_SIZE,
+                 step=None, expanding=False, warm_start=True):
+    """
+    Per-fold one-step-ahead errors for `df` (with 'Date' and the feature columns).
+    The scaler is fitted on the first training window only, so later folds
+    never see future prices through it.
+    """
+    features = list(features)
+
+    values = df[features].to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d').to_numpy()
+    folds = fold_bounds(len(values), lookback, train_size, test_size, step, expanding)
+    if not folds:
+        raise ValueError(f"Need more than {lookback + train_size + test_size} bars for one fold, got {len(values)}")
+
+    sc = MinMaxScaler(feature_range=(0, 1)).fit(values[:folds[0][1]])
+    X, y, _ = make_supervised(sc.transform(values), lookback)
+
+    def windows(start, end):
+        # Window j predicts row j + lookback
+        return slice(start - lookback, end - lookback)
+
+    forecaster = get_forecaster(model, lookback, len(features))
+    results = []
+    trained_until = None
+    for k, (train_start, train_end, test_start, test_end) in enumerate(folds):
+        started = time.perf_counter()
+        warm = warm_start and trained_until is not None
+        fit_start = max(train_start, trained_until) if warm else train_start
+        fit = windows(fit_start, train_end)
+        forecaster.fit(X[fit], y[fit], warm_start=warm)
+        trained_until = train_end
+
+        predicted = _inverse(sc, forecaster.predict(X[windows(test_start, test_end)]))
+        actual = values[test_start:test_end, 0]
+        previous = values[test_start - 1:test_end - 1, 0]
+        errors = predicted - actual
+        results.append({
+            'fold': k,
+            'train_start': dates[train_start],
+            'train_end': dates[train_end - 1],
+            'test_start': dates[test_start],
+            'test_end': dates[test_end - 1],
+            'fit_windows': train_end - fit_start,
+            'warm_start': warm,
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mape': float(np.mean(np.abs(errors / actual)) * 100),
+            'naive_rmse': float(np.sqrt(np.mean((previous - actual) ** 2))),
+            'direction_accuracy': float(np.mean(np.sign(predicted - previous) == np.sign(actual - previous))),
+            'seconds': round(time.perf_counter() - started, 3),
+        })
+    return results
+
+
+def summarize(folds):
+    frame = pd.DataFrame(folds)
+    return {
+        'folds': len(frame),
+        'rmse_mean': float(frame['rmse'].mean()),
+        'rmse_median': float(frame['rmse'].median()),
+        'mape_mean': float(frame['mape'].mean()),
+        'naive_rmse_mean': float(frame['naive_rmse'].mean()),
+        # Above 0 means better than predicting yesterday's close
+        'skill': float(1 - frame['rmse'].mean() / frame['naive_rmse'].mean()),
+        'direction_accuracy': float(frame['direction_accuracy'].mean()),
+        'seconds': float(frame['seconds'].sum()),
+    }
+
+
+def _init_worker(threads):
+    # Keep TensorFlow from giving every worker all the cores
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+
+
+def _run_ticker(ticker, records, options):
+    """ Runs inside a pool process: one ticker's folds, in order. """
+    df = pd.DataFrame(records)
+    folds = walk_forward(df, **options)
+    for fold in folds:
+        fold['ticker'] = ticker
+    return folds
+
+
+def run_backtest(tickers, years=5, workers=BACKTEST_WORKERS, **options):
+    """
+    Walk-forward backtest for every ticker, `workers` tickers at a time.
+    Returns ({ticker: [fold, ...]}, {ticker: error message}).
+    """
+    from ohlcv_store import get_histories
+    end = datetime.now() + timedelta(days=1)
+    histories = get_histories(tickers, end - timedelta(days=int(365.25 * years)), end)
+
+    results, errors = {}, {}
+    threads = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = {}
+        for ticker in tickers:
+            data = histories.get(ticker)
+            if data is None or data.empty:
+                errors[ticker] = 'No data found for ticker'
+                continue
+            records = data.reset_index().assign(Date=lambda d: d['Date'].dt.strftime('%Y-%m-%d')).to_dict(orient='records')
+            futures[pool.submit(_run_ticker, ticker, records, options)] = ticker
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = str(e)
+    return results, errors
+
+
+def write_report(results, errors, out_dir, model='lstm'):
+    """ folds.csv (one row per ticker and fold) and summary.json (per ticker and errors). """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = [fold for folds in results.values() for fold in folds]
+    if rows:
+        columns = ['ticker'] + [c for c in rows[0] if c != 'ticker']
+        pd.DataFrame(rows, columns=columns).to_csv(os.path.join(out_dir, 'folds.csv'), index=False)
+    summary = {'model': model, 'tickers': {ticker: summarize(folds) for ticker, folds in results.items()}, 'errors': errors}
+    with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def latest_summary(ticker, model='lstm', backtest_dir=BACKTEST_DIR):
+    """ `ticker`'s stats from the newest report under `backtest_dir` that backtested `model`, or None. """
+    try:
+        paths = [os.path.join(backtest_dir, run, 'summary.json') for run in os.listdir(backtest_dir)]
+    except FileNotFoundError:
+        return None
+    # Newest first; --out folders aren't necessarily timestamped, so go by mtime
+    paths = sorted((p for p in paths if os.path.isfile(p)), key=os.path.getmtime, reverse=True)
+    for path in paths:
+        try:
+            with open(path) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # Reports written before the model was recorded were all LSTM runs
+        if summary.get('model', 'lstm') == model and ticker in summary.get('tickers', {}):
+            return summary['tickers'][ticker]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the forecasting models.')
+    parser.add_argument('tickers', nargs='*', help='Yahoo tickers, e.g. RELIANCE.NS')
+    parser.add_argument('--universe', help='File with one ticker per line')
+    parser.add_argument('--model', default='lstm')
+    parser.add_argument('--years', type=float, default=5, help='History to backtest over')
+    parser.add_argument('--train', type=int, default=TRAIN_SIZE, help='Bars per training window')
+    parser.add_argument('--test', type=int, default=TEST_SIZE, help='Bars predicted per fold')
+    parser.add_argument('--step', type=int, help='Bars to roll forward between folds (default: --test)')
+    parser.add_argument('--expanding', action='store_true', help='Train on all bars so far instead of a rolling window')
+    parser.add_argument('--cold', action='store_true', help='Train every fold from scratch instead of warm-starting')
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    parser.add_argument('--out', help='Output directory (default: a timestamped folder under BACKTEST_DIR)')
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.universe:
+        with open(args.universe) as f:
+            tickers += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        parser.error('give tickers or --universe')
+
+    out_dir = args.out or os.path.join(BACKTEST_DIR, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    results, errors = run_backtest(
+        tickers, years=args.years, workers=args.workers, model=args.model, train_size=args.train,
+        test_size=args.test, step=args.step, expanding=args.expanding, warm_start=not args.cold,
+    )
+    summary = write_report(results, errors, out_dir, model=args.model)
+    for ticker, stats in sorted(summary['tickers'].items()):
+        print(f"{ticker:<16} folds={stats['folds']:<4} rmse={stats['rmse_mean']:.4f} "
+              f"naive={stats['naive_rmse_mean']:.4f} skill={stats['skill']:+.3f} "
+              f"direction={stats['direction_accuracy']:.2%} {stats['seconds']:.1f}s")
+    for ticker, error in errors.items():
+        print(f"{ticker:<16} error: {error}")
+    print(f"Report written to {out_dir}")
+    return 1 if errors and not results else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
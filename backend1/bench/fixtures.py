@@ -0,0 +1,143 @@
+import os
+import io
+import json
+import zlib
+import numpy as np
+import pandas as pd
+
+# Upstream data the benchmark replays instead of calling Yahoo and Google Finance.
+# Recorded fixtures (see record_fixtures.py) live under FIXTURES_DIR; any ticker
+# without one gets a deterministic synthetic stand-in of the same shape, so the
+# suite also runs on a fresh checkout. Recorded bars are moved onto the most
+# recent business days, so "last two years" requests always find data.
+FIXTURES_DIR = os.environ.get('BENCH_FIXTURES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+
+STOCKS = ['RELIANCE', 'TCS', 'INFY', 'HDFCBANK', 'ICICIBANK', 'SBIN', 'ITC', 'LT']
+# The home page indices
+INDEX_SYMBOLS = ['^NSEI', '^NSEBANK', '^BSESN', '^CNXIT', '^CNXFMCG', '^CNXAUTO']
+
+HISTORY_YEARS = 3
+STATEMENTS = ('balance_sheet', 'financials', 'cashflow')
+
+
+def yahoo_symbol(stock):
+    return f"{stock}.NS"
+
+
+def _seed(name):
+    return zlib.crc32(name.encode())
+
+
+def _last_bar_day():
+    return pd.Timestamp.today().normalize() - pd.offsets.BDay(1)
+
+
+def synthetic_bars(symbol, years=HISTORY_YEARS):
+    """ A geometric random walk of daily OHLCV bars ending on the last business day. """
+    rng = np.random.default_rng(_seed(symbol))
+    dates = pd.bdate_range(end=_last_bar_day(), periods=252 * years, name='Date')
+    start_price = 20000.0 if symbol.startswith('^') else float(rng.uniform(100, 4000))
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+    spread = close * rng.uniform(0.002, 0.02, len(dates))
+    open_ = close + rng.normal(0, 0.5, len(dates)) * spread
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread / 2,
+        'Low': np.minimum(open_, close) - spread / 2,
+        'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, len(dates)).astype(float),
+    }, index=dates)
+
+
+def synthetic_statement(symbol, kind):
+    rng = np.random.default_rng(_seed(f"{symbol}:{kind}"))
+    items = {
+        'balance_sheet': ['Total Assets', 'Total Debt', 'Stockholders Equity', 'Cash And Cash Equivalents'],
+        'financials': ['Total Revenue', 'Gross Profit', 'Operating Income', 'Net Income'],
+        'cashflow': ['Operating Cash Flow', 'Capital Expenditure', 'Free Cash Flow', 'Repurchase Of Capital Stock'],
+    }[kind]
+    year = _last_bar_day().year
+    columns = pd.to_datetime([f"{year - i}-03-31" for i in range(1, 5)])
+    values = rng.uniform(1e9, 1e12, (len(items), len(columns)))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return pd.DataFrame(values, index=items, columns=columns)
+
+
+def synthetic_info(symbol):
+    rng = np.random.default_rng(_seed(f"{symbol}:info"))
+    return {
+        'symbol': symbol,
+        'longName': f"{symbol.split('.')[0].title()} Limited",
+        'sector': 'Synthetic',
+        'marketCap': int(rng.uniform(1e11, 2e13)),
+        'trailingPE': round(float(rng.uniform(8, 60)), 2),
+        'dividendYield': round(float(rng.uniform(0, 0.04)), 4),
+        'fiftyTwoWeekHigh': round(float(rng.uniform(500, 5000)), 2),
+        'fiftyTwoWeekLow': round(float(rng.uniform(100, 500)), 2),
+        'currency': 'INR',
+    }
+
+
+def synthetic_page(stock, news_items=8):
+    """ A Google Finance quote page reduced to the elements scraper.py reads. """
+    rng = np.random.default_rng(_seed(f"{stock}:page"))
+    price = float(rng.uniform(100, 4000))
+    change = float(rng.normal(0, 1.5))
+    news = ''.join(
+        f'<div class="z4rs2b"><a href="https://news.example.com/{stock.lower()}/{i}">'
+        f'<div class="sfyJob">Example Wire</div><div class="Adak">{i + 1} hours ago</div>'
+        f'<div class="Yfwt5">{stock} shares {"rise" if (i + change) % 2 > 1 else "slip"} as '
+        f'markets react to quarterly update {i}</div></a></div>'
+        for i in range(news_items)
+    )
+    return (
+        f'<html><body><main><div class="YMlKec fxKbKc">₹{price:,.2f}</div>'
+        f'<div class="JwB6zf">{abs(change):.2f}%</div>'
+        f'<section>{news}</section></main></body></html>'
+    )
+
+
+class Fixtures:
+    """ Bars, statements, info dicts and Google Finance pages, recorded or synthetic. """
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self._bars = {}
+        self.recorded = set()
+
+    def _path(self, *parts):
+        return os.path.join(self.fixtures_dir, *parts)
+
+    def _read(self, *parts):
+        path = self._path(*parts)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def bars(self, symbol):
+        if symbol not in self._bars:
+            text = self._read('bars', f"{symbol}.csv")
+            if text is None:
+                bars = synthetic_bars(symbol)
+            else:
+                bars = pd.read_csv(io.StringIO(text), index_col='Date', parse_dates=True)
+                # Replay the recorded series as if it ended on the last business day
+                bars.index = pd.bdate_range(end=_last_bar_day(), periods=len(bars), name='Date')
+                self.recorded.add(symbol)
+            self._bars[symbol] = bars
+        return self._bars[symbol]
+
+    def statement(self, symbol, kind):
+        text = self._read('fundamentals', f"{symbol}.{kind}.json")
+        if text is None:
+            return synthetic_statement(symbol, kind)
+        return pd.read_json(io.StringIO(text), orient='split')
+
+    def info(self, symbol):
+        text = self._read('info', f"{symbol}.json")
+        return json.loads(text) if text is not None else synthetic_info(symbol)
+
+    def page(self, stock):
+        text = self._read('google', f"{stock}.html")
+        return text if text is not None else synthetic_page(stock)
@@ -0,0 +1,82 @@
+"""
+Record live upstream responses as benchmark fixtures.
+
+Run from backend1/ with network access:
+    python -m bench.record_fixtures                # the default stocks and indices
+    python -m bench.record_fixtures RELIANCE TCS   # just these NSE symbols
+
+Writes daily bars, financial statements and info for each symbol from Yahoo,
+and each stock's Google Finance quote page, under bench/fixtures/. Anything not
+recorded is synthesised by fixtures.py when the benchmark runs. yfinance
+returns empty results instead of raising when Yahoo can't be reached, so
+empty responses count as failures and nothing is written for them.
+"""
+import os
+import sys
+import json
+import traceback
+from datetime import datetime, timedelta
+import yfinance as yf
+from bench.fixtures import FIXTURES_DIR, HISTORY_YEARS, INDEX_SYMBOLS, STATEMENTS, STOCKS, yahoo_symbol
+from scraper import fetch_page
+
+
+def _write(text, *parts):
+    path = os.path.join(FIXTURES_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def record_bars(symbol):
+    end = datetime.now()
+    start = end - timedelta(days=365 * HISTORY_YEARS)
+    bars = yf.Ticker(symbol).history(start=start, end=end, auto_adjust=True)
+    bars = bars[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(how='all')
+    bars.index = bars.index.tz_localize(None).normalize()
+    bars.index.name = 'Date'
+    if bars.empty:
+        raise ValueError(f"No bars returned for {symbol}")
+    _write(bars.to_csv(), 'bars', f"{symbol}.csv")
+    return len(bars)
+
+
+def record_company(symbol):
+    ticker = yf.Ticker(symbol)
+    # Fetch everything first, so a failure doesn't leave a partial set behind
+    statements = {kind: getattr(ticker, kind) for kind in STATEMENTS}
+    info = ticker.info
+    empty = [kind for kind, statement in statements.items() if statement.empty] + ([] if info else ['info'])
+    if empty:
+        raise ValueError(f"No {', '.join(empty)} returned for {symbol}")
+    for kind, statement in statements.items():
+        _write(statement.to_json(orient='split', date_format='iso'), 'fundamentals', f"{symbol}.{kind}.json")
+    _write(json.dumps(info, indent=1, default=str), 'info', f"{symbol}.json")
+
+
+def record_page(stock):
+    response = fetch_page(f"https://www.google.com/finance/quote/{stock}:NSE?hl=en", 'quote')
+    response.raise_for_status()
+    _write(response.text, 'google', f"{stock}.html")
+
+
+def main(argv=None):
+    stocks = argv if argv else STOCKS
+    jobs = [(record_bars, symbol) for symbol in INDEX_SYMBOLS if not argv]
+    for stock in stocks:
+        symbol = yahoo_symbol(stock)
+        jobs += [(record_bars, symbol), (record_company, symbol), (record_page, stock)]
+
+    failed = 0
+    for fn, name in jobs:
+        try:
+            result = fn(name)
+            print(f"{fn.__name__} {name}" + (f": {result} rows" if result is not None else ''))
+        except Exception:
+            failed += 1
+            print(f"{fn.__name__} {name} failed:\n{traceback.format_exc()}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
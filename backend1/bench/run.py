@@ -0,0 +1,304 @@
+"""
+Offline benchmark for the backend: every route in app.py (plus LSTM_ALGO directly)
+driven through Flask's test client at a chosen concurrency, with Yahoo, Google
+Finance and Mongo replaced by local stand-ins (see standins.py / fixtures.py).
+
+Run from backend1/, after pip install -r requirements-dev.txt (mongomock):
+    python -m bench.run                         # all scenarios, 8 concurrent clients
+    python -m bench.run -c 32 -n 500 -s stock_data -s latest_prices
+    python -m bench.run --json after.json --compare before.json --tolerance 0.2
+
+Reports p50/p99/mean latency, throughput and error count per scenario, and the
+process's peak RSS (its high-water mark after each scenario, so growth shows
+where memory went). With --compare, exits non-zero when a scenario's p50 or
+p99 is more than --tolerance slower than the baseline.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BENCH_USER = 'bench-user'
+
+
+def _isolate_state():
+    """ Keep bars, models, jobs and the prefetch lock in a throwaway directory. """
+    state_dir = tempfile.mkdtemp(prefix='stockhub-bench-')
+    os.environ.setdefault('OHLCV_STORE_DIR', os.path.join(state_dir, 'ohlcv'))
+    os.environ.setdefault('MODEL_DIR', os.path.join(state_dir, 'models'))
+    os.environ.setdefault('JOBS_DIR', os.path.join(state_dir, 'jobs'))
+    os.environ.setdefault('FUNDAMENTALS_STORE_DIR', os.path.join(state_dir, 'fundamentals'))
+    os.environ.setdefault('PREFETCH_LOCK', os.path.join(state_dir, 'prefetch.lock'))
+    os.environ.pop('PREFETCH', None)
+    os.environ.pop('WARM_MODELS', None)
+    os.environ.pop('INFERENCE_URL', None)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    return state_dir
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+def _has(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def seed_watchlists(watchlist):
+    from bench.fixtures import STOCKS
+    watchlist.delete_many({'UserId': BENCH_USER})
+    watchlist.insert_many([
+        {'UserId': BENCH_USER, 'Watchlist': f"list-{i % 3}", 'Stock': stock, 'stockName': stock.title(), 'Price': 0.0}
+        for i, stock in enumerate(STOCKS)
+    ])
+
+
+def build_scenarios(fixtures):
+    """ name -> {'call': fn(client, i) -> (status, body), 'ok': statuses, optional 'requests'/'concurrency'/'needs'} """
+    from bench.fixtures import STOCKS, yahoo_symbol
+
+    symbols = [yahoo_symbol(s) for s in STOCKS]
+    bars = fixtures.bars(symbols[0]).reset_index()
+    end = bars['Date'].iloc[-1] + np.timedelta64(1, 'D')
+    start = end - np.timedelta64(365, 'D')
+    start_date, end_date = str(start.date()), str(end.date())
+    prediction_payload = {
+        'ticker': symbols[0],
+        'stockData': bars.tail(500).assign(Date=lambda d: d['Date'].dt.strftime('%Y-%m-%d')).to_dict(orient='records'),
+    }
+    trades = []
+    for i, stock in enumerate(STOCKS):
+        for j, (date, close) in enumerate(zip(bars['Date'].dt.strftime('%Y-%m-%d'), bars['Close'])):
+            if j % 5 == 0:
+                trades.append({'symbol': stock, 'side': 'buy' if j % 10 == 0 else 'sell',
+                               'quantity': 10 + i, 'price': round(float(close), 2), 'date': date})
+    portfolio = [
+        {'symbol': stock, 'buy_price': 100.0 + i, 'sell_price': 120.0 + 3 * i, 'quantity': 50,
+         'buy_date': '2023-01-02', 'sell_date': '2024-06-03' if i % 2 else '2023-09-01'}
+        for i, stock in enumerate(STOCKS)
+    ]
+
+    def pick(items, i):
+        return items[i % len(items)]
+
+    def get(path):
+        return lambda client, i: _get(client, path(i))
+
+    def _get(client, url):
+        response = client.get(url)
+        return response.status_code, response.get_data()
+
+    def post(path, body):
+        def call(client, i):
+            response = client.post(path, json=body(i) if callable(body) else body)
+            return response.status_code, response.get_data()
+        return call
+
+    def stream_first_event(client, i):
+        # Time to the first pushed update, then disconnect
+        query = {'indices': 'Nifty 50,Sensex', 'tickers': pick(STOCKS, i)}
+        response = client.get('/stream/quotes', query_string=query, buffered=False)
+        try:
+            for chunk in response.iter_encoded():
+                if chunk.startswith(b'data:'):
+                    return response.status_code, chunk
+        finally:
+            response.close()
+        return response.status_code, b''
+
+    def submit_and_poll(client, i):
+        response = client.post('/predict/jobs', json=prediction_payload)
+        job_id = response.get_json()['job_id']
+        status = client.get(f"/predict/jobs/{job_id}")
+        return status.status_code, status.get_data()
+
+    def lstm_algo(registry):
+        def call(client, i):
+            from stock_prediction_models import LSTM_ALGO
+            from prediction_jobs import parse_stock_data
+            LSTM_ALGO(parse_stock_data(prediction_payload), ticker=symbols[0], registry=registry)
+            return 200, b''
+        return call
+
+    return {
+        'latest_prices': {'call': get(lambda i: '/latest-prices'), 'ok': (200,)},
+        'stock_data': {'call': get(lambda i: f"/stock-data?ticker={pick(symbols, i)}&start_date={start_date}&end_date={end_date}"), 'ok': (200,)},
+        'stock_data_columnar': {'call': get(lambda i: f"/stock-data?ticker={pick(symbols, i)}&start_date={start_date}&end_date={end_date}&format=columnar"), 'ok': (200,)},
+        'stock_data_batch': {'call': get(lambda i: f"/stock-data-batch?tickers={','.join(symbols[:4])}&start_date={start_date}&end_date={end_date}&normalize=1&correlation=1"), 'ok': (200,)},
+        'indicators': {'call': get(lambda i: f"/indicators?ticker={pick(symbols, i)}&start_date={start_date}&end_date={end_date}&indicators=sma:20,ema:50,rsi,macd,bollinger,vwap,volatility"), 'ok': (200,)},
+        'stock_data1': {'call': get(lambda i: f"/stock-data1?ticker={pick(symbols, i)}"), 'ok': (200,)},
+        'fundamental_data': {'call': get(lambda i: f"/fundamental-data?ticker={pick(symbols, i)}"), 'ok': (200,)},
+        'stock_info': {'call': get(lambda i: f"/stock-info?ticker={pick(symbols, i)}"), 'ok': (200,)},
+        'stock_news': {'call': get(lambda i: f"/stock-news1?ticker={pick(symbols, i)}"), 'ok': (200,)},
+        'holidays': {'call': get(lambda i: f"/holidays?country=IN&year={2020 + i % 6}"), 'ok': (200,)},
+        'get_watchlist': {'call': get(lambda i: f"/get-watchlist?userId={BENCH_USER}"), 'ok': (200,)},
+        'current_price': {'call': get(lambda i: f"/current-price?ticker={pick(STOCKS, i)}&watchlist_name=list-{i % 3}&userId={BENCH_USER}&stockName=x"), 'ok': (200,)},
+        'refresh_watchlist': {'call': post('/refresh-watchlist', {'userId': BENCH_USER}), 'ok': (200,)},
+        'remove_stock_missing': {'call': lambda client, i: _status(client.delete(f"/remove-stock?watchlist_name=list-0&stock_symbol=NOPE{i}&user_id={BENCH_USER}")), 'ok': (404,)},
+        'remove_watchlist_scratch': {'call': lambda client, i: _status(client.delete(f"/remove-watchlist?watchlist_name=scratch-{i}")), 'ok': (200,)},
+        'stream_quotes': {'call': stream_first_event, 'ok': (200,), 'requests': 50},
+        'calculate_tax': {'call': post('/calculate-tax', {'portfolio': portfolio}), 'ok': (200,)},
+        'calculate_tax_trades': {'call': post('/calculate-tax/trades?lots=0', {'trades': trades}), 'ok': (200,), 'requests': 50},
+        'predict': {'call': post('/predict', prediction_payload), 'ok': (200,), 'requests': 5, 'concurrency': 1, 'needs': 'keras'},
+        'predict_jobs': {'call': submit_and_poll, 'ok': (200,), 'requests': 20, 'needs': 'keras'},
+        'forecast': {'call': post('/forecast', {'tickers': symbols, 'horizon': 5}), 'ok': (200,), 'needs': 'keras'},
+        'lstm_algo_full': {'call': lstm_algo(None), 'ok': (200,), 'requests': 2, 'concurrency': 1, 'needs': 'keras'},
+        'metrics': {'call': get(lambda i: '/metrics'), 'ok': (200,)},
+    }
+
+
+def _status(response):
+    return response.status_code, response.get_data()
+
+
+def run_scenario(app, scenario, requests, concurrency, warmup=1):
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        started = time.perf_counter()
+        try:
+            status, _ = scenario['call'](client, i)
+        except Exception as e:
+            status = repr(e)
+        return time.perf_counter() - started, status
+
+    for i in range(warmup):
+        one(-1 - i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = np.array([elapsed for elapsed, _ in results]) * 1000
+    errors = [status for _, status in results if status not in scenario['ok']]
+    own_rss, children_rss = _peak_rss_mb()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'first_error': str(errors[0]) if errors else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'mean_ms': round(float(latencies.mean()), 2),
+        'throughput_rps': round(requests / wall, 1),
+        'peak_rss_mb': own_rss,
+        'peak_child_rss_mb': children_rss,
+    }
+
+
+def print_report(results):
+    header = f"{'scenario':<26}{'n':>6}{'c':>4}{'err':>5}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'rps':>9}{'rss MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<26}{r['requests']:>6}{r['concurrency']:>4}{r['errors']:>5}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['mean_ms']:>10}{r['throughput_rps']:>9}{r['peak_rss_mb']:>9}")
+        if r['first_error']:
+            print(f"    first error: {r['first_error'][:200]}")
+
+
+def compare(results, baseline, tolerance, floor_ms=1.0):
+    """ Scenarios whose p50 or p99 got more than `tolerance` slower than `baseline`. """
+    regressions = []
+    for name, r in results.items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            if before[key] >= floor_ms and r[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {before[key]} -> {r[key]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--scenario', action='append', help='Run only these scenarios (repeatable)')
+    parser.add_argument('-n', '--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per scenario first')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated upstream latency per call, in ms')
+    parser.add_argument('--mongo', choices=('mock', 'local'), default='mock', help='In-memory mongomock or MONGO_URI')
+    parser.add_argument('--fake-sentiment', action='store_true', help='Skip FinBERT and label every headline Neutral')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Baseline results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs the baseline (0.25 = 25%%)')
+    parser.add_argument('--list', action='store_true', help='List scenarios and exit')
+    args = parser.parse_args(argv)
+
+    state_dir = _isolate_state()
+    try:
+        from bench.fixtures import Fixtures
+        from bench import standins
+
+        fixtures = Fixtures()
+        db_module = standins.install(fixtures, mongo=args.mongo, latency=args.latency / 1000,
+                                     fake_sentiment=args.fake_sentiment or not _has('transformers'))
+        from app import app
+
+        scenarios = build_scenarios(fixtures)
+        if args.list:
+            print('\n'.join(scenarios))
+            return 0
+        names = args.scenario or list(scenarios)
+        unknown = [n for n in names if n not in scenarios]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+        seed_watchlists(db_module.watchlist)
+
+        results = {}
+        for name in names:
+            scenario = scenarios[name]
+            if scenario.get('needs') and not _has(scenario['needs']):
+                print(f"skipping {name}: {scenario['needs']} is not installed")
+                continue
+            results[name] = run_scenario(
+                app, scenario,
+                requests=min(scenario.get('requests', args.requests), args.requests),
+                concurrency=scenario.get('concurrency', args.concurrency),
+                warmup=args.warmup,
+            )
+
+        print_report(results)
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'compare', 'list')},
+            'recorded_fixtures': sorted(fixtures.recorded),
+            'scenarios': results,
+        }
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare(results, json.load(f), args.tolerance)
+            if regressions:
+                print('\nRegressions:')
+                print('\n'.join(f"  {line}" for line in regressions))
+                return 1
+            print('\nNo regressions against the baseline.')
+        return 0
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
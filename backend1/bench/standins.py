@@ -0,0 +1,120 @@
+import re
+import time
+import pandas as pd
+
+# Local stand-ins for the upstream services, installed by patching the module
+# attributes the backend calls through (yf.download, yf.Ticker, scraper.session,
+# db.db/db.watchlist). `latency` adds a fixed per-call delay in seconds to mimic
+# the network; the default of 0 measures only the backend's own work.
+# install() must run before `app` is imported, since app binds db objects at import.
+
+QUOTE_URL = re.compile(r'/finance/quote/([^:/?]+):NSE')
+
+
+class StandinTicker:
+    def __init__(self, fixtures, symbol, latency=0.0):
+        self.fixtures = fixtures
+        self.symbol = symbol
+        self.latency = latency
+
+    def history(self, start=None, end=None, **kwargs):
+        time.sleep(self.latency)
+        bars = self.fixtures.bars(self.symbol)
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            bars = bars[bars.index < pd.Timestamp(end)]
+        return bars.copy()
+
+    def _statement(self, kind):
+        time.sleep(self.latency)
+        return self.fixtures.statement(self.symbol, kind)
+
+    @property
+    def balance_sheet(self):
+        return self._statement('balance_sheet')
+
+    @property
+    def financials(self):
+        return self._statement('financials')
+
+    @property
+    def cashflow(self):
+        return self._statement('cashflow')
+
+    @property
+    def info(self):
+        time.sleep(self.latency)
+        return dict(self.fixtures.info(self.symbol))
+
+
+def make_download(fixtures, latency=0.0):
+    """ yf.download replacement: bars for [start, end) grouped as (Ticker, Price) columns. """
+    def download(tickers, start=None, end=None, **kwargs):
+        time.sleep(latency)
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        frames = {}
+        for ticker in tickers:
+            bars = StandinTicker(fixtures, ticker).history(start, end)
+            if not bars.empty:
+                frames[ticker] = bars
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+    return download
+
+
+class StandinResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+
+class StandinSession:
+    """ requests.Session stand-in serving Google Finance quote pages from fixtures. """
+
+    def __init__(self, fixtures, latency=0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def get(self, url, timeout=None, **kwargs):
+        time.sleep(self.latency)
+        match = QUOTE_URL.search(url)
+        if not match:
+            return StandinResponse(404, '')
+        return StandinResponse(200, self.fixtures.page(match.group(1)))
+
+
+def install_mongo(mode):
+    """
+    'mock' swaps in an in-memory mongomock client; 'local' keeps the real client,
+    pointed at MONGO_URI/MONGO_DB (set MONGO_DB to a scratch database).
+    """
+    import db as db_module
+    if mode == 'mock':
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock is required for --mongo mock (pip install -r requirements-dev.txt), or use --mongo local")
+        client = mongomock.MongoClient()
+        db_module.client = client
+        db_module.db = client[db_module.MONGO_DB]
+        db_module.watchlist = db_module.db.watchlist
+    return db_module
+
+
+def install(fixtures, mongo='mock', latency=0.0, fake_sentiment=False):
+    """ Patch every upstream the backend talks to. Returns the db module in use. """
+    import yfinance as yf
+    import scraper
+
+    yf.download = make_download(fixtures, latency)
+    yf.Ticker = lambda symbol, *args, **kwargs: StandinTicker(fixtures, symbol, latency)
+    scraper.session = StandinSession(fixtures, latency)
+
+    if fake_sentiment:
+        import sentiment
+        sentiment.analyze_sentiment = lambda texts: [{'label': 'Neutral', 'score': 1.0} for _ in texts]
+
+    return install_mongo(mongo)
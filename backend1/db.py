@@ -0,0 +1,92 @@
+import os
+import logging
+import threading
+from pymongo import MongoClient, IndexModel, ASCENDING, monitoring
+from metrics import upstream_duration, upstream_errors
+
+# One pooled MongoClient per process, configured from the environment
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+MONGO_DB = os.environ.get('MONGO_DB', 'stocks')
+
+logger = logging.getLogger(__name__)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """ Times every Mongo command (find, update, aggregate, ...) as an upstream call. """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        upstream_duration.observe(event.duration_micros / 1e6, upstream='mongo', operation=event.command_name)
+
+    def failed(self, event):
+        upstream_duration.observe(event.duration_micros / 1e6, upstream='mongo', operation=event.command_name)
+        upstream_errors.inc(upstream='mongo', operation=event.command_name)
+
+
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+    maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_MS', 60000)),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    connectTimeoutMS=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+    event_listeners=[CommandMetrics()],
+)
+
+db = client[MONGO_DB]
+
+watchlist = db.watchlist
+
+WATCHLIST_INDEXES = [
+    # get-watchlist, current-price and remove-stock with a user id
+    IndexModel([('UserId', ASCENDING), ('Watchlist', ASCENDING), ('Stock', ASCENDING)], name='user_watchlist_stock'),
+    # remove-watchlist and remove-stock without a user id
+    IndexModel([('Watchlist', ASCENDING), ('Stock', ASCENDING)], name='watchlist_stock'),
+    # distinct tickers across all watchlists (prefetching)
+    IndexModel([('Stock', ASCENDING)], name='stock'),
+]
+
+
+def ensure_indexes():
+    """ Create the watchlist indexes; existing ones with the same spec are left alone. """
+    watchlist.create_indexes(WATCHLIST_INDEXES)
+
+
+def ensure_indexes_in_background():
+    """ Run ensure_indexes() without holding up startup when Mongo is slow or down. """
+    def run():
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logger.warning("Error creating Mongo indexes: %s", e)
+
+    thread = threading.Thread(target=run, name='mongo-indexes', daemon=True)
+    thread.start()
+    return thread
+
+
+def grouped_watchlists(user_id):
+    """
+    A user's watchlists as [{'name': ..., 'items': [...]}], grouped by Mongo.
+    Lists and items keep their insertion order.
+    """
+    pipeline = [
+        {'$match': {'UserId': user_id}},
+        {'$sort': {'_id': 1}},
+        {'$group': {
+            '_id': '$Watchlist',
+            'first': {'$min': '$_id'},
+            'items': {'$push': {
+                '_id': {'$toString': '$_id'},
+                'Watchlist': '$Watchlist',
+                'Stock': '$Stock',
+                'stockName': '$stockName',
+                'Price': '$Price',
+            }},
+        }},
+        {'$sort': {'first': 1}},
+        {'$project': {'_id': 0, 'name': '$_id', 'items': 1}},
+    ]
+    return list(watchlist.aggregate(pipeline))
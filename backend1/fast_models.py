@@ -0,0 +1,218 @@
+import os
+import math
+import logging
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_squared_error
+from sklearn.preprocessing import MinMaxScaler
+from cache import TTLCache
+from metrics import model_duration
+from windowing import LOOKBACK, FEATURES, make_supervised
+
+# CPU fast path next to the LSTM: forecasters that fit in milliseconds with
+# plain numpy/scikit-learn, so a prediction never has to load TensorFlow.
+# They share LSTMForecaster's fit(X, y, warm_start)/predict(X) interface on
+# scaled windows (so the walk-forward backtest can score them) and FAST_ALGO
+# returns the same values as LSTM_ALGO (so /predict responds the same way).
+#
+# select_model() walk-forward tests the fast models on the request's own data
+# and compares them with the LSTM's error from the latest offline backtest of
+# the ticker, if any, then picks the cheapest model whose MAPE is within
+# MODEL_SELECTOR_TOLERANCE of the best. The choice is cached per ticker.
+MODEL_SELECTOR_TOLERANCE = float(os.environ.get('MODEL_SELECTOR_TOLERANCE', 0.05))
+MODEL_SELECTION_TTL = int(os.environ.get('MODEL_SELECTION_TTL', 24 * 3600))
+
+# Walk-forward settings for scoring the fast models at request time
+SELECTOR_TRAIN_SIZE = 250
+SELECTOR_TEST_SIZE = 20
+
+logger = logging.getLogger(__name__)
+
+
+class _WindowForecaster:
+    """
+    Base for the fast forecasters. They refit from scratch in milliseconds, so a
+    warm-started fit keeps the earlier windows and refits on old + new ones.
+    """
+    name = None
+
+    def __init__(self, lookback=LOOKBACK, n_features=1):
+        self.lookback = lookback
+        self.n_features = n_features
+        self._X = None
+        self._y = None
+
+    def fit(self, X, y, warm_start=False):
+        X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        if warm_start and self._X is not None:
+            X, y = np.concatenate([self._X, X]), np.concatenate([self._y, y])
+        self._X, self._y = X, y
+        with model_duration.time(model=self.name, phase='train'):
+            self._fit(X, y)
+        return self
+
+    def predict(self, X):
+        with model_duration.time(model=self.name, phase='infer'):
+            return np.asarray(self._predict(np.asarray(X, dtype=np.float64))).reshape(-1)
+
+
+class RidgeForecaster(_WindowForecaster):
+    """ Ridge regression on the flattened lookback window (an AR model over all features). """
+    name = 'ridge'
+
+    def __init__(self, lookback=LOOKBACK, n_features=1, alpha=1e-3):
+        super().__init__(lookback, n_features)
+        self.alpha = alpha
+        self.model = None
+
+    def _fit(self, X, y):
+        self.model = Ridge(alpha=self.alpha).fit(X.reshape(len(X), -1), y)
+
+    def _predict(self, X):
+        return self.model.predict(X.reshape(len(X), -1))
+
+
+class ExpSmoothingForecaster(_WindowForecaster):
+    """
+    Holt's linear-trend exponential smoothing over each window of the target
+    column. alpha/beta are grid-searched on the training windows' one-step error.
+    """
+    name = 'exp_smoothing'
+    ALPHAS = np.linspace(0.05, 1.0, 20)
+    BETAS = (0.0, 0.05, 0.1, 0.2, 0.4)
+
+    def __init__(self, lookback=LOOKBACK, n_features=1):
+        super().__init__(lookback, n_features)
+        self.alpha, self.beta = 1.0, 0.0
+
+    @staticmethod
+    def _smooth(series, alpha, beta):
+        # Vectorised over windows: series is (windows, lookback)
+        level = series[:, 0]
+        trend = series[:, 1] - series[:, 0] if series.shape[1] > 1 else np.zeros(len(series))
+        for t in range(1, series.shape[1]):
+            previous = level
+            level = alpha * series[:, t] + (1 - alpha) * (level + trend)
+            trend = beta * (level - previous) + (1 - beta) * trend
+        return level + trend
+
+    def _fit(self, X, y):
+        series = X[:, :, 0]
+        self.alpha, self.beta = min(
+            ((alpha, beta) for alpha in self.ALPHAS for beta in self.BETAS),
+            key=lambda params: np.mean((self._smooth(series, *params) - y) ** 2),
+        )
+
+    def _predict(self, X):
+        return self._smooth(X[:, :, 0], self.alpha, self.beta)
+
+
+FORECASTERS = {
+    'ridge': RidgeForecaster,
+    'exp_smoothing': ExpSmoothingForecaster,
+}
+
+# Cheapest first, as measured with FAST_ALGO on 300-1000 bars: one Ridge fit takes
+# ~6 ms, Holt's grid search over every window ~20 ms, and the LSTM seconds.
+# select_model() takes the first one that is accurate enough.
+MODEL_COST_ORDER = ('ridge', 'exp_smoothing', 'lstm')
+
+
+def get_fast_forecaster(name, lookback=LOOKBACK, n_features=1):
+    try:
+        return FORECASTERS[name](lookback=lookback, n_features=n_features)
+    except KeyError:
+        raise ValueError(f"Unknown model '{name}'") from None
+
+
+def _inverse_target(sc, values):
+    return (np.asarray(values).reshape(-1, 1) - sc.min_[0]) / sc.scale_[0]
+
+
+def FAST_ALGO(df, model='ridge', return_report=False, lookback=LOOKBACK, features=FEATURES):
+    """
+    LSTM_ALGO's counterpart for the fast forecasters: same 80/20 split and the
+    same (prediction, rmse, actual-vs-predicted frame, test volume) result.
+    The model is scored on the test split after training on the bars before
+    it, then refitted on every window to forecast the next close.
+    """
+    features = list(features)
+    split = int(0.8 * len(df))
+
+    feature_set = df[features].to_numpy(dtype=np.float64)
+    real_stock_price = feature_set[split:, :1]
+
+    sc = MinMaxScaler(feature_range=(0, 1)).fit(feature_set)
+    X_all, y_all, X_forecast = make_supervised(sc.transform(feature_set), lookback)
+    # X_all[i] predicts row i + lookback, so test rows split.. come from windows split-lookback..
+    test_from = split - lookback
+
+    forecaster = get_fast_forecaster(model, lookback, len(features))
+    forecaster.fit(X_all[:test_from], y_all[:test_from])
+    predicted_stock_price = _inverse_target(sc, forecaster.predict(X_all[test_from:]))
+    error = math.sqrt(mean_squared_error(real_stock_price, predicted_stock_price))
+
+    forecaster.fit(X_all, y_all)
+    prediction = _inverse_target(sc, forecaster.predict(X_forecast))[0, 0]
+
+    df1 = pd.DataFrame({
+        "Actual Data": real_stock_price.flatten(),
+        "Predicted": predicted_stock_price.flatten(),
+    })
+    df2_test = df['Volume'][split:].values
+
+    if return_report:
+        mape = float(np.mean(np.abs((real_stock_price - predicted_stock_price) / real_stock_price)) * 100)
+        return prediction, error, df1, df2_test, {'mode': 'fast', 'model': model, 'rmse': error, 'mape': mape}
+    return prediction, error, df1, df2_test
+
+
+_selections = TTLCache(maxsize=5000, ttl=MODEL_SELECTION_TTL, name='model_selection')
+
+
+def candidate_errors(df, lookback=LOOKBACK, features=FEATURES):
+    """ {model: walk-forward MAPE} for the fast models on `df`; models without enough bars are left out. """
+    from backtest import walk_forward, summarize
+    train_size = max(min(SELECTOR_TRAIN_SIZE, len(df) // 2), 4 * lookback)
+    errors = {}
+    for name in FORECASTERS:
+        try:
+            folds = walk_forward(df, model=name, lookback=lookback, features=features,
+                                 train_size=train_size, test_size=SELECTOR_TEST_SIZE)
+        except ValueError:
+            continue
+        errors[name] = summarize(folds)['mape_mean']
+    return errors
+
+
+def select_model(ticker, df, tolerance=MODEL_SELECTOR_TOLERANCE, lookback=LOOKBACK, features=FEATURES):
+    """
+    {'model': name, 'mape': {model: error}}: the cheapest model whose MAPE is
+    within `tolerance` of the best one. Falls back to the cheapest model when
+    the fast models can't be scored on `df` (too few bars).
+    """
+    key = (ticker, lookback, tuple(features)) if ticker else None
+    if key is not None:
+        cached = _selections.get(key)
+        if cached is not None:
+            return cached
+
+    errors = candidate_errors(df, lookback, features)
+    if ticker:
+        from backtest import latest_summary
+        lstm = latest_summary(ticker, 'lstm')
+        if lstm is not None:
+            errors['lstm'] = lstm['mape_mean']
+
+    if any(name in errors for name in FORECASTERS):
+        best = min(errors.values())
+        choice = next(name for name in MODEL_COST_ORDER if name in errors and errors[name] <= best * (1 + tolerance))
+    else:
+        choice = MODEL_COST_ORDER[0]
+    selection = {'model': choice, 'mape': errors}
+    logger.info("Selected forecasting model", extra={'ticker': ticker, **selection})
+
+    if key is not None:
+        _selections.set(key, selection)
+    return selection
@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from metrics import model_duration, record_cache
+from model_registry import registry as default_registry
+from ohlcv_store import get_recent_history
+
+# Multi-step forecasts from the stored per-ticker LSTMs, feeding each prediction
+# back in as the newest row of the window (recursive forecasting). Every ticker
+# has its own model, so the requested models are wrapped into one multi-input
+# Keras model: each step is then a single predict_on_batch call for all tickers
+# instead of one call per ticker. With INFERENCE_URL set, app.py forwards
+# forecasts to the inference worker, so Keras isn't loaded in web workers.
+MAX_HORIZON = int(os.environ.get('FORECAST_MAX_HORIZON', 30))
+MAX_TICKERS = int(os.environ.get('FORECAST_MAX_TICKERS', 50))
+MODEL_CACHE_SIZE = int(os.environ.get('FORECAST_MODEL_CACHE_SIZE', 32))
+# Combined models are kept per set of tickers, so a repeated request isn't rebuilt and retraced
+STACKED_CACHE_SIZE = int(os.environ.get('FORECAST_STACKED_CACHE_SIZE', 8))
+
+_model_cache = OrderedDict()
+_stacked_cache = OrderedDict()
+_model_cache_lock = threading.Lock()
+_loader = ThreadPoolExecutor(max_workers=8)
+
+
+def _load_model(ticker, registry):
+    """ Latest stored (model, scaler, meta) for `ticker`, kept in a small in-process LRU. """
+    latest = registry.latest_meta(ticker)
+    if latest is None:
+        return None
+    key = (ticker, latest['fingerprint'])
+    with _model_cache_lock:
+        cached = key in _model_cache
+        if cached:
+            _model_cache.move_to_end(key)
+            entry = _model_cache[key]
+    record_cache('forecast_models', cached)
+    if cached:
+        return entry
+    loaded = registry.latest(ticker)
+    if loaded is None:
+        return None
+    with _model_cache_lock:
+        _model_cache[key] = loaded
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+    return loaded
+
+
+def _stacked_model(keys, models):
+    """
+    One Keras model with an input and an output per model in `models`, so a
+    single predict_on_batch call runs all of them. Cached by `keys`, the
+    (ticker, fingerprint) of each model.
+    """
+    key = tuple(keys)
+    with _model_cache_lock:
+        cached = key in _stacked_cache
+        if cached:
+            _stacked_cache.move_to_end(key)
+            stacked = _stacked_cache[key]
+    record_cache('forecast_stacked_models', cached)
+    if cached:
+        return stacked
+
+    from keras import Input, Model, Sequential
+    inputs = [Input(shape=model.input_shape[1:], name=f"window_{i}") for i, model in enumerate(models)]
+    # Loaded models can share a name, so each is wrapped under a unique one
+    outputs = [Sequential([model], name=f"model_{i}")(x) for i, (model, x) in enumerate(zip(models, inputs))]
+    stacked = Model(inputs, outputs)
+    with _model_cache_lock:
+        _stacked_cache[key] = stacked
+        while len(_stacked_cache) > STACKED_CACHE_SIZE:
+            _stacked_cache.popitem(last=False)
+    return stacked
+
+
+def recursive_forecast(model, windows, horizon):
+    """
+    Forecast `horizon` steps for a list of scaled window batches, one per input
+    of `model`, each shaped (batch, lookback, features). Each prediction replaces
+    the target column of the next row; other features are carried forward from
+    the last observed row. Returns scaled predictions shaped (batch, horizon),
+    one array per input.
+    """
+    xs = [np.array(w, dtype=np.float32) for w in windows]
+    predictions = [np.empty((x.shape[0], horizon), dtype=np.float32) for x in xs]
+    for step in range(horizon):
+        outputs = model.predict_on_batch(xs if len(xs) > 1 else xs[0])
+        if not isinstance(outputs, (list, tuple)):
+            outputs = [outputs]
+        for i, output in enumerate(outputs):
+            predictions[i][:, step] = np.asarray(output).reshape(-1)
+            next_row = xs[i][:, -1, :].copy()
+            next_row[:, 0] = predictions[i][:, step]
+            xs[i] = np.concatenate([xs[i][:, 1:, :], next_row[:, None, :]], axis=1)
+    return predictions
+
+
+def forecast_tickers(tickers, horizon, registry=default_registry):
+    """
+    Forecast `horizon` business days ahead for every ticker that has a stored
+    model. Returns {ticker: {"dates": [...], "forecast": [...]}} or an "error"
+    entry for tickers without data or a trained model.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    histories = dict(zip(tickers, _loader.map(get_recent_history, tickers)))
+    models = dict(zip(tickers, _loader.map(lambda t: _load_model(t, registry), tickers)))
+
+    results = {}
+    # (ticker, last date, model, scaler, fingerprint, scaled window) of every ticker that can be forecast
+    ready = []
+    for ticker in tickers:
+        data, loaded = histories[ticker], models[ticker]
+        if data.empty:
+            results[ticker] = {'error': 'No data found for ticker'}
+            continue
+        if loaded is None:
+            results[ticker] = {'error': 'No trained model for ticker'}
+            continue
+        model, sc, meta = loaded
+        lookback = meta['lookback']
+        features = meta.get('features', ['Close'])
+        if len(data) < lookback:
+            results[ticker] = {'error': 'Not enough data for ticker'}
+            continue
+        window = sc.transform(data[features].to_numpy(dtype=np.float64)[-lookback:])
+        ready.append((ticker, data.index[-1], model, sc, meta['fingerprint'], window))
+    if not ready:
+        return results
+
+    if len(ready) == 1:
+        model = ready[0][2]
+    else:
+        model = _stacked_model([(ticker, fingerprint) for ticker, _, _, _, fingerprint, _ in ready],
+                               [model for _, _, model, _, _, _ in ready])
+    with model_duration.time(model='lstm', phase='forecast'):
+        scaled = recursive_forecast(model, [window[None] for *_, window in ready], horizon)
+
+    for (ticker, last_date, _, sc, _, _), row in zip(ready, scaled):
+        # Undo the scaling of the target column only
+        prices = (row[0] - sc.min_[0]) / sc.scale_[0]
+        dates = pd.bdate_range(pd.Timestamp(last_date) + pd.Timedelta(days=1), periods=horizon)
+        results[ticker] = {
+            'dates': dates.strftime('%Y-%m-%d').tolist(),
+            'forecast': [round(float(p), 2) for p in prices],
+        }
+    return results
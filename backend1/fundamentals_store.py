@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from cache import TTLCache
+from metrics import track_upstream
+
+# Financial statements and company info change once a reporting period at most,
+# so each ticker's /fundamental-data and /stock-info bodies are kept on disk as
+# ready-to-send JSON, next to a meta file recording the latest period seen.
+# Requests are answered from the stored body (through a small in-process tier
+# that also picks up other workers' refreshes). A refresh is only started,
+# in the background and once per ticker at a time, after the period following
+# the latest stored one has ended, i.e. when a new filing may have appeared;
+# until it does show up the ticker is re-checked every FUNDAMENTALS_RECHECK.
+# Company info also carries market fields (price, market cap), so it is
+# additionally refreshed once it is older than INFO_MAX_AGE.
+STORE_DIR = os.environ.get('FUNDAMENTALS_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fundamentals'))
+FUNDAMENTALS_RECHECK = float(os.environ.get('FUNDAMENTALS_RECHECK', 24 * 3600))
+INFO_MAX_AGE = float(os.environ.get('INFO_MAX_AGE', 24 * 3600))
+# Back-off after a failed background refresh
+FUNDAMENTALS_RETRY = float(os.environ.get('FUNDAMENTALS_RETRY', 15 * 60))
+FUNDAMENTALS_REFRESH_WORKERS = int(os.environ.get('FUNDAMENTALS_REFRESH_WORKERS', 4))
+# How long a body stays in memory before the disk copy is read again
+FUNDAMENTALS_MEMORY_TTL = float(os.environ.get('FUNDAMENTALS_MEMORY_TTL', 600))
+
+# Statement periods when they can't be inferred from the columns
+ANNUAL_PERIOD_DAYS = 365
+QUARTER_PERIOD_DAYS = 91
+
+STATEMENTS = (
+    ('b', 'balance_sheet', 'balance_sheet'),
+    ('i', 'income_statement', 'financials'),
+    ('c', 'cash_flow', 'cashflow'),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def df_to_dict(df):
+    """ Convert DataFrame to dictionary, with timestamps as strings. Leaves `df` untouched. """
+    if isinstance(df, pd.DataFrame):
+        return df.set_axis(df.index.astype(str), axis=0).set_axis(df.columns.astype(str), axis=1).to_dict()
+    return {}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default)
+
+
+def _period_end(statements):
+    """ (latest period end, period length in days) across the statements' columns. """
+    ends = pd.DatetimeIndex([])
+    for statement in statements:
+        if isinstance(statement, pd.DataFrame) and len(statement.columns):
+            ends = ends.append(pd.to_datetime(statement.columns, errors='coerce').dropna())
+    ends = ends.unique().sort_values()
+    if ends.empty:
+        return None, ANNUAL_PERIOD_DAYS
+    period_days = int(np.median(np.diff(ends.asi8)) / 86400e9) if len(ends) > 1 else ANNUAL_PERIOD_DAYS
+    return ends[-1], max(period_days, QUARTER_PERIOD_DAYS)
+
+
+class FundamentalsStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._memory = TTLCache(maxsize=2000, ttl=FUNDAMENTALS_MEMORY_TTL, name='fundamentals')
+        self._executor = ThreadPoolExecutor(max_workers=FUNDAMENTALS_REFRESH_WORKERS)
+        self._inflight = set()
+        self._retry_after = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, ticker, kind):
+        name = ticker.replace('^', '_').replace('/', '_')
+        base = os.path.join(self.store_dir, f"{name}.{kind}")
+        return base + '.json', base + '.meta.json'
+
+    def _load(self, ticker, kind):
+        body_path, meta_path = self._paths(ticker, kind)
+        try:
+            with open(body_path, encoding='utf-8') as f:
+                body = f.read()
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return body, meta
+
+    def _save(self, ticker, kind, body, meta):
+        body_path, meta_path = self._paths(ticker, kind)
+        # Write to temp files and rename so readers never see a half-written file
+        with open(body_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(body_path + '.tmp', body_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _fetch_fundamentals(self, ticker):
+        yf_ticker = yf.Ticker(ticker)
+        with track_upstream('yfinance', 'fundamentals'):
+            statements = [getattr(yf_ticker, attr) for _, _, attr in STATEMENTS]
+        body = _dumps({
+            key: {name: df_to_dict(statement.fillna("null"))}
+            for (key, name, _), statement in zip(STATEMENTS, statements)
+        })
+        latest, period_days = _period_end(statements)
+        now = time.time()
+        meta = {'fetched_at': now, 'checked_at': now}
+        if latest is not None:
+            meta['latest_period'] = latest.strftime('%Y-%m-%d')
+            meta['next_period_end'] = (latest + pd.Timedelta(days=period_days)).timestamp()
+        return body, meta
+
+    def _fetch_info(self, ticker):
+        with track_upstream('yfinance', 'info'):
+            info = yf.Ticker(ticker).info
+        if not info:
+            return None, None
+        now = time.time()
+        meta = {'fetched_at': now, 'checked_at': now, 'max_age': INFO_MAX_AGE}
+        if info.get('mostRecentQuarter'):
+            meta['latest_period'] = datetime.fromtimestamp(info['mostRecentQuarter']).strftime('%Y-%m-%d')
+            meta['next_period_end'] = info['mostRecentQuarter'] + QUARTER_PERIOD_DAYS * 86400
+        return _dumps(info), meta
+
+    def _fetch(self, ticker, kind):
+        return self._fetch_fundamentals(ticker) if kind == 'fundamentals' else self._fetch_info(ticker)
+
+    @staticmethod
+    def _refresh_due(meta, now):
+        if meta.get('max_age') and now - meta['fetched_at'] >= meta['max_age']:
+            return True
+        if now - meta['checked_at'] < FUNDAMENTALS_RECHECK:
+            return False
+        # Nothing new can have been filed before the next period has even ended
+        return meta.get('next_period_end') is None or now >= meta['next_period_end']
+
+    def _refresh(self, ticker, kind):
+        key = (ticker, kind)
+        try:
+            body, meta = self._fetch(ticker, kind)
+            if body is None:
+                raise ValueError('empty response')
+            self._save(ticker, kind, body, meta)
+            self._memory.set(key, (body, meta))
+            logger.info("Refreshed %s", kind, extra={'ticker': ticker, 'latest_period': meta.get('latest_period')})
+        except Exception:
+            # Keep serving the stored body; try again after a back-off instead of on every request
+            self._retry_after[key] = time.time() + FUNDAMENTALS_RETRY
+            logger.warning("Error refreshing %s", kind, extra={'ticker': ticker}, exc_info=True)
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def _refresh_in_background(self, ticker, kind):
+        with self._lock:
+            if (ticker, kind) in self._inflight or self._retry_after.get((ticker, kind), 0) > time.time():
+                return
+            self._inflight.add((ticker, kind))
+        self._executor.submit(self._refresh, ticker, kind)
+
+    def get(self, ticker, kind):
+        """
+        Stored JSON body for `ticker` ('fundamentals' or 'info'), fetched now if
+        there is none yet; None when Yahoo has nothing for the ticker. A due
+        refresh runs in the background while the stored body is returned.
+        """
+        key = (ticker, kind)
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(ticker, kind)
+            if entry is None:
+                body, meta = self._fetch(ticker, kind)
+                if body is None:
+                    return None
+                self._save(ticker, kind, body, meta)
+                entry = (body, meta)
+            self._memory.set(key, entry)
+
+        body, meta = entry
+        if self._refresh_due(meta, time.time()):
+            self._refresh_in_background(ticker, kind)
+        return body
+
+
+store = FundamentalsStore()
+
+
+def get_fundamentals_json(ticker):
+    """ /fundamental-data body: {"b": {"balance_sheet": ...}, "i": {"income_statement": ...}, "c": {"cash_flow": ...}}. """
+    return store.get(ticker, 'fundamentals')
+
+
+def get_info_json(ticker):
+    """ /stock-info body (yfinance `info`), or None when there is none. """
+    return store.get(ticker, 'info')
@@ -0,0 +1,15 @@
+import os
+
+# Picked up automatically by `gunicorn app:app` run from backend1/.
+# /stream/quotes keeps a response open for as long as a dashboard is open, so
+# the default sync workers (one request at a time) would be used up by a few
+# viewers. Threaded workers hold one thread per stream instead, and app.py
+# caps streams per process (MAX_STREAMS) below the thread count so ordinary
+# requests always have threads left. Each worker process runs its own quote
+# poller; they share upstream fetches through the quote cache.
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# With gthread the timeout is a worker heartbeat, not a per-request limit, so open streams are fine
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
@@ -0,0 +1,211 @@
+import os
+import numpy as np
+import pandas as pd
+from cache import TTLCache
+from ohlcv_store import get_history, persist_end
+
+# Technical indicators computed server-side with vectorized pandas/NumPy kernels.
+# Results are cached per (ticker, indicator, params) and extended incrementally:
+# window indicators recompute only the new bars plus their look-back window, and
+# EMA-based ones continue from the last smoothed values. Bars that may still be
+# forming are never folded into the cached state.
+INDICATOR_CACHE_SIZE = int(os.environ.get('INDICATOR_CACHE_SIZE', 2000))
+INDICATOR_CACHE_TTL = int(os.environ.get('INDICATOR_CACHE_TTL', 24 * 3600))
+
+
+def _ewm(values, alpha, seed=None):
+    """ Recursive EMA (adjust=False). With `seed`, continues from that previous value. """
+    if seed is None:
+        return values.ewm(alpha=alpha, adjust=False).mean()
+    seeded = pd.concat([pd.Series([seed]), values.reset_index(drop=True)], ignore_index=True)
+    smoothed = seeded.ewm(alpha=alpha, adjust=False).mean().iloc[1:]
+    smoothed.index = values.index
+    return smoothed
+
+
+class RollingIndicator:
+    """ Window-based indicator: extending it needs only the last `warmup` bars. """
+
+    def __init__(self, kernel, warmup):
+        self.kernel = kernel
+        self.warmup = warmup
+
+    def compute(self, bars, params, state=None):
+        tail = state['tail'] if state else bars.iloc[:0]
+        full = pd.concat([tail, bars])
+        result = self.kernel(full, **params).iloc[len(tail):]
+        return result, {'tail': full.tail(self.warmup(**params))}
+
+
+class RecursiveIndicator:
+    """ EMA-based indicator: extending it needs only the last smoothed values. """
+
+    def __init__(self, kernel, warmup):
+        self.kernel = kernel
+        # Bars needed before the first returned value for the seed to have decayed
+        self.warmup = warmup
+
+    def compute(self, bars, params, state=None):
+        return self.kernel(bars, state=state, **params)
+
+
+# Window kernels
+
+def _sma(bars, window=20):
+    return pd.DataFrame({'sma': bars['Close'].rolling(window).mean()})
+
+
+def _bollinger(bars, window=20, k=2.0):
+    close = bars['Close']
+    mid = close.rolling(window).mean()
+    std = close.rolling(window).std(ddof=0)
+    return pd.DataFrame({'middle': mid, 'upper': mid + k * std, 'lower': mid - k * std})
+
+
+def _vwap(bars, window=20):
+    typical = (bars['High'] + bars['Low'] + bars['Close']) / 3
+    volume = bars['Volume']
+    return pd.DataFrame({'vwap': (typical * volume).rolling(window).sum() / volume.rolling(window).sum()})
+
+
+def _volatility(bars, window=20, periods=252):
+    """ Annualised rolling standard deviation of daily log returns. """
+    log_returns = np.log(bars['Close']).diff()
+    return pd.DataFrame({'volatility': log_returns.rolling(window).std() * np.sqrt(periods)})
+
+
+# Recursive kernels
+
+def _ema(bars, span=20, state=None):
+    ema = _ewm(bars['Close'], 2 / (span + 1), state['ema'] if state else None)
+    return pd.DataFrame({'ema': ema}), {'ema': ema.iloc[-1]}
+
+
+def _macd(bars, fast=12, slow=26, signal=9, state=None):
+    close = bars['Close']
+    fast_ema = _ewm(close, 2 / (fast + 1), state['fast'] if state else None)
+    slow_ema = _ewm(close, 2 / (slow + 1), state['slow'] if state else None)
+    macd = fast_ema - slow_ema
+    signal_line = _ewm(macd, 2 / (signal + 1), state['signal'] if state else None)
+    result = pd.DataFrame({'macd': macd, 'signal': signal_line, 'histogram': macd - signal_line})
+    return result, {'fast': fast_ema.iloc[-1], 'slow': slow_ema.iloc[-1], 'signal': signal_line.iloc[-1]}
+
+
+def _rsi(bars, window=14, state=None):
+    """ Wilder's RSI, smoothing gains and losses with alpha = 1 / window. """
+    close = bars['Close']
+    previous = close.shift(1)
+    if state:
+        previous.iloc[0] = state['close']
+    delta = close - previous
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    if not state:
+        # The very first bar has no change to average in
+        gain, loss = gain.iloc[1:], loss.iloc[1:]
+    avg_gain = _ewm(gain, 1 / window, state['gain'] if state else None)
+    avg_loss = _ewm(loss, 1 / window, state['loss'] if state else None)
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = rsi.where(avg_loss != 0, 100.0).reindex(close.index)
+    new_state = {'close': close.iloc[-1]}
+    new_state['gain'] = avg_gain.iloc[-1] if len(avg_gain) else (state['gain'] if state else None)
+    new_state['loss'] = avg_loss.iloc[-1] if len(avg_loss) else (state['loss'] if state else None)
+    return pd.DataFrame({'rsi': rsi}), new_state
+
+
+INDICATORS = {
+    'sma': (RollingIndicator(_sma, lambda window=20: window), {'window': 20}),
+    'bollinger': (RollingIndicator(_bollinger, lambda window=20, k=2.0: window), {'window': 20, 'k': 2.0}),
+    'vwap': (RollingIndicator(_vwap, lambda window=20: window), {'window': 20}),
+    'volatility': (RollingIndicator(_volatility, lambda window=20, periods=252: window + 1), {'window': 20, 'periods': 252}),
+    'ema': (RecursiveIndicator(_ema, lambda span=20: 3 * span), {'span': 20}),
+    'macd': (RecursiveIndicator(_macd, lambda fast=12, slow=26, signal=9: 3 * (slow + signal)),
+             {'fast': 12, 'slow': 26, 'signal': 9}),
+    'rsi': (RecursiveIndicator(_rsi, lambda window=14: 5 * window), {'window': 14}),
+}
+
+
+def parse_spec(spec):
+    """
+    'sma:50' / 'macd:12:26:9' / 'rsi' -> (name, params), filling in defaults in
+    the order they're declared. Raises ValueError for unknown indicators or bad parameters.
+    """
+    name, *values = spec.strip().split(':')
+    name = name.lower()
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{name}', expected one of: {', '.join(INDICATORS)}")
+    defaults = INDICATORS[name][1]
+    if len(values) > len(defaults):
+        raise ValueError(f"Too many parameters for '{name}'")
+    params = dict(defaults)
+    for key, value in zip(defaults, values):
+        params[key] = type(defaults[key])(value)
+        if params[key] <= 0:
+            raise ValueError(f"Parameter '{key}' of '{name}' must be positive")
+    return name, params
+
+
+def spec_label(name, params):
+    return '_'.join([name] + [f"{v:g}" if isinstance(v, float) else str(v) for v in params.values()])
+
+
+class IndicatorEngine:
+    def __init__(self, maxsize=INDICATOR_CACHE_SIZE, ttl=INDICATOR_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name='indicators')
+
+    @staticmethod
+    def _warmup_days(indicator, params):
+        # Calendar days covering the indicator's warm-up bars, allowing for weekends and holidays
+        return int(indicator.warmup(**params) * 1.6) + 10
+
+    def compute(self, ticker, name, params, start, end):
+        """ Indicator `name` for `ticker` over [start, end), reusing and extending cached results. """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        indicator = INDICATORS[name][0]
+        key = (ticker, name, tuple(sorted(params.items())))
+        history_start = start - pd.Timedelta(days=self._warmup_days(indicator, params))
+
+        entry = self._cache.get(key)
+        if entry is None or entry['first'] > history_start:
+            # Nothing usable cached: compute over the whole history
+            bars = get_history(ticker, history_start, end)
+            entry = {'first': history_start, 'last': None, 'result': None, 'state': None}
+        else:
+            # Only fetch the bars after the last one already folded in
+            if end <= entry['last'] + pd.Timedelta(days=1):
+                bars = pd.DataFrame()
+            else:
+                bars = get_history(ticker, entry['last'] + pd.Timedelta(days=1), end)
+
+        live_from = persist_end(ticker)
+        final = bars[bars.index < live_from] if not bars.empty else bars
+        live = bars[bars.index >= live_from] if not bars.empty else bars
+
+        if not final.empty:
+            result, state = indicator.compute(final, params, entry['state'])
+            entry = {
+                'first': entry['first'],
+                'last': final.index[-1],
+                'result': result if entry['result'] is None else pd.concat([entry['result'], result]),
+                'state': state,
+            }
+            self._cache.set(key, entry)
+
+        result = entry['result']
+        if not live.empty:
+            # Forming bars are computed on top of the cached state but never stored
+            live_result, _ = indicator.compute(live, params, entry['state'])
+            result = live_result if result is None else pd.concat([result, live_result])
+
+        if result is None:
+            return pd.DataFrame()
+        return result[(result.index >= start) & (result.index < end)]
+
+
+engine = IndicatorEngine()
+
+
+def compute_indicators(ticker, specs, start, end):
+    """ {label: DataFrame} for each 'name[:param...]' spec. """
+    parsed = [parse_spec(spec) for spec in specs]
+    return {spec_label(name, params): engine.compute(ticker, name, params, start, end) for name, params in parsed}
@@ -0,0 +1,78 @@
+import os
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+# This process hosts the models itself, so never forward to another inference worker
+os.environ.pop('INFERENCE_URL', None)
+import logging
+from flask import Flask, Response, request, jsonify
+from log_config import configure_logging
+from metrics import CONTENT_TYPE, init_app, render
+from prediction_jobs import parse_stock_data, build_prediction_response
+from ml_models import analyze_sentiment, get_lstm_algo, warm_up
+from forecasting import forecast_tickers
+
+# Shared inference worker: one process holding FinBERT and TensorFlow for all web
+# workers. Run it with a single worker, e.g.
+#   gunicorn -w 1 --threads 4 -b 127.0.0.1:5001 inference_server:app
+# and start the web app with INFERENCE_URL=http://127.0.0.1:5001
+app = Flask(__name__)
+configure_logging()
+init_app(app)
+logger = logging.getLogger(__name__)
+
+warm_up(background=True)
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/sentiment', methods=['POST'])
+def sentiment():
+    data = request.get_json() or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list):
+        return jsonify({'error': "'texts' must be a list"}), 400
+    try:
+        return jsonify({'results': analyze_sentiment(texts)})
+    except Exception as e:
+        logger.exception("Sentiment error")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    data = request.get_json()
+    try:
+        stock_data = parse_stock_data(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        LSTM_ALGO = get_lstm_algo()
+        # The payload comes from a client, so the trained model isn't saved to the registry
+        lstm_prediction, lstm_error, df1, df2 = LSTM_ALGO(stock_data, ticker=data.get('ticker'), store=False)
+        return jsonify(build_prediction_response(stock_data, lstm_prediction, lstm_error, df1, df2))
+    except Exception as e:
+        logger.exception("LSTM error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/forecast', methods=['POST'])
+def forecast():
+    # Inputs are validated by the web app before forwarding
+    data = request.get_json() or {}
+    try:
+        return jsonify({'forecasts': forecast_tickers(data.get('tickers') or [], int(data.get('horizon', 1)))})
+    except Exception as e:
+        logger.exception("Forecast error")
+        return jsonify({'error': str(e)}), 500
+
+
+if __name__ == '__main__':
+    app.run(port=int(os.environ.get('INFERENCE_PORT', 5001)))
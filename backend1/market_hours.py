@@ -0,0 +1,71 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import holidays
+
+# NSE cash-market session times and trading calendar
+IST = ZoneInfo('Asia/Kolkata')
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+
+
+@lru_cache(maxsize=8)
+def exchange_holidays(year):
+    """ NSE trading holidays for `year`, falling back to India's public holidays on older `holidays` releases. """
+    try:
+        return holidays.financial_holidays('XNSE', years=year)
+    except (AttributeError, NotImplementedError, KeyError):
+        return holidays.CountryHoliday('IN', years=year)
+
+
+def now_ist():
+    return datetime.now(IST)
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in exchange_holidays(day.year)
+
+
+def is_market_open(now=None):
+    now = now or now_ist()
+    return is_trading_day(now.date()) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_open(now=None):
+    """ Start of the next trading session after `now` (or `now` itself if the market is open). """
+    now = now or now_ist()
+    if is_market_open(now):
+        return now
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=IST)
+
+
+def seconds_until_next_open(now=None):
+    now = now or now_ist()
+    return max((next_open(now) - now).total_seconds(), 0)
+
+
+def last_close(now=None):
+    """ End of the most recent session that has finished by `now`. """
+    now = now or now_ist()
+    day = now.date()
+    if not (is_trading_day(day) and now.time() >= MARKET_CLOSE):
+        day -= timedelta(days=1)
+        while not is_trading_day(day):
+            day -= timedelta(days=1)
+    return datetime.combine(day, MARKET_CLOSE, tzinfo=IST)
+
+
+def last_open(now=None):
+    """ Start of the most recent session that has begun by `now` (possibly still running). """
+    now = now or now_ist()
+    day = now.date()
+    if not (is_trading_day(day) and now.time() >= MARKET_OPEN):
+        day -= timedelta(days=1)
+        while not is_trading_day(day):
+            day -= timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=IST)
@@ -0,0 +1,174 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# In-process metrics in the Prometheus text format: route latency, upstream call
+# timings and errors (yfinance, Google Finance, Mongo, the inference server),
+# cache hits/misses and model train/infer durations. Values are per process, so
+# with several workers each one reports its own series.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Model training runs into minutes
+MODEL_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {float(value)!r}"
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {float(total)!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Time to build each response, by route.', ('method', 'route', 'status'))
+upstream_duration = Histogram(
+    'upstream_request_duration_seconds', 'Duration of calls to external services.', ('upstream', 'operation'))
+upstream_errors = Counter(
+    'upstream_errors_total', 'Failed calls to external services.', ('upstream', 'operation'))
+cache_requests = Counter(
+    'cache_requests_total', 'Cache lookups by outcome (hit/miss).', ('cache', 'result'))
+model_duration = Histogram(
+    'model_duration_seconds', 'Model training and inference time.', ('model', 'phase'), buckets=MODEL_BUCKETS)
+
+
+@contextmanager
+def track_upstream(upstream, operation):
+    """ Time a call to an external service, counting it as an error if it raises. """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(upstream=upstream, operation=operation)
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - start, upstream=upstream, operation=operation)
+
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _render_hit_ratios():
+    with cache_requests._lock:
+        counts = dict(cache_requests._values)
+    lines = ["# HELP cache_hit_ratio Share of lookups answered from the cache since start.",
+             "# TYPE cache_hit_ratio gauge"]
+    for cache in sorted({cache for cache, _ in counts}):
+        hits = counts.get((cache, 'hit'), 0)
+        total = hits + counts.get((cache, 'miss'), 0)
+        if total:
+            lines.append(f'cache_hit_ratio{{cache="{_escape(cache)}"}} {hits / total!r}')
+    return lines
+
+
+def render():
+    """ All metrics in the Prometheus text exposition format. """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_render_hit_ratios())
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """ Record latency for every request and log it at debug level. """
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        start = getattr(g, '_request_start', None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_duration.observe(elapsed, method=request.method, route=route, status=response.status_code)
+            logger.debug("request", extra={
+                'method': request.method, 'route': route, 'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+            })
+        return response
@@ -0,0 +1,86 @@
+import os
+import logging
+import threading
+import requests
+from metrics import model_duration, track_upstream
+
+# Heavy ML dependencies (transformers/FinBERT, TensorFlow/Keras) are imported on
+# first use instead of at app import, so lightweight endpoints start instantly.
+# WARM_MODELS=1 loads them in a background thread right after startup instead.
+# With INFERENCE_URL set, sentiment, /predict and /forecast are forwarded to one
+# shared inference_server.py process, so the models aren't loaded in every web worker.
+INFERENCE_URL = os.environ.get('INFERENCE_URL', '').rstrip('/')
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 120))
+SENTIMENT_MODEL = os.environ.get('SENTIMENT_MODEL', 'ProsusAI/finbert')
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sentiment_pipeline = None
+_lstm_algo = None
+
+
+def get_sentiment_pipeline():
+    global _sentiment_pipeline
+    with _lock:
+        if _sentiment_pipeline is None:
+            from transformers import pipeline
+            _sentiment_pipeline = pipeline("text-classification", model=SENTIMENT_MODEL)
+        return _sentiment_pipeline
+
+
+def get_lstm_algo():
+    global _lstm_algo
+    with _lock:
+        if _lstm_algo is None:
+            from stock_prediction_models import LSTM_ALGO
+            _lstm_algo = LSTM_ALGO
+        return _lstm_algo
+
+
+def warm_up(background=True):
+    """ Load both models now, optionally in a daemon thread. No-op when using a remote inference worker. """
+    if INFERENCE_URL:
+        return None
+
+    def load():
+        try:
+            get_lstm_algo()
+            get_sentiment_pipeline()
+            logger.info("ML models loaded")
+        except Exception:
+            logger.exception("Error warming up ML models")
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='ml-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def analyze_sentiment(texts):
+    """ FinBERT label/score for each text, locally or on the shared inference worker. """
+    if INFERENCE_URL:
+        with track_upstream('inference_server', 'sentiment'):
+            response = requests.post(f"{INFERENCE_URL}/sentiment", json={'texts': texts}, timeout=INFERENCE_TIMEOUT)
+            response.raise_for_status()
+        return response.json()['results']
+    pipeline = get_sentiment_pipeline()
+    with model_duration.time(model='finbert', phase='infer'):
+        return pipeline(texts)
+
+
+def predict_remote(payload):
+    """ Forward a /predict payload to the shared inference worker. Returns (body, status). """
+    with track_upstream('inference_server', 'predict'):
+        response = requests.post(f"{INFERENCE_URL}/predict", json=payload, timeout=INFERENCE_TIMEOUT)
+    return response.json(), response.status_code
+
+
+def forecast_remote(tickers, horizon):
+    """ forecast_tickers() on the shared inference worker. """
+    with track_upstream('inference_server', 'forecast'):
+        response = requests.post(f"{INFERENCE_URL}/forecast", json={'tickers': tickers, 'horizon': horizon}, timeout=INFERENCE_TIMEOUT)
+        response.raise_for_status()
+    return response.json()['forecasts']
@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+
+# Trained LSTMs are saved per ticker, keyed by a fingerprint of the data they were
+# trained on, together with the fitted scaler, so /predict can skip retraining.
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'models'))
+
+# A stored model is reused for newer data until its last training bar is older than this
+MODEL_MAX_AGE_DAYS = int(os.environ.get('MODEL_MAX_AGE_DAYS', 7))
+
+# Every new fingerprint adds a model; older ones beyond this many per ticker are deleted
+MODEL_KEEP_PER_TICKER = int(os.environ.get('MODEL_KEEP_PER_TICKER', 3))
+
+# Tickers become directory names, so only plain exchange symbols are accepted
+# (at least one letter or digit, so '.' and '..' can't name a directory)
+TICKER_PATTERN = re.compile(r'^(?=.*[A-Z0-9])[A-Z0-9^.&-]+$')
+
+
+def is_valid_ticker(ticker):
+    return isinstance(ticker, str) and TICKER_PATTERN.match(ticker) is not None
+
+
+def data_fingerprint(df):
+    """ Stable hash of the Date/Close series a model is trained on. """
+    dates = pd.to_datetime(df['Date']).values.astype('datetime64[D]').astype(np.int64)
+    closes = np.asarray(df['Close'], dtype=np.float64)
+    digest = hashlib.sha1()
+    digest.update(dates.tobytes())
+    digest.update(closes.tobytes())
+    return digest.hexdigest()[:16]
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR, max_age_days=MODEL_MAX_AGE_DAYS, keep_per_ticker=MODEL_KEEP_PER_TICKER):
+        self.model_dir = model_dir
+        self.max_age_days = max_age_days
+        self.keep_per_ticker = max(1, keep_per_ticker)
+        self._lock = threading.Lock()
+
+    def _ticker_dir(self, ticker):
+        if not ticker:
+            return os.path.join(self.model_dir, '_anonymous')
+        if not is_valid_ticker(ticker):
+            raise ValueError(f"Invalid ticker '{ticker}'")
+        return os.path.join(self.model_dir, ticker.replace('^', '_'))
+
+    def _paths(self, ticker, fingerprint):
+        base = os.path.join(self._ticker_dir(ticker), fingerprint)
+        return base + '.keras', base + '.scaler.pkl', base + '.json'
+
+    def _read_meta(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def is_stale(self, meta, last_date):
+        """ A model is stale once the data has moved more than max_age_days past its last bar. """
+        age = (pd.Timestamp(last_date) - pd.Timestamp(meta['last_date'])).days
+        return age > self.max_age_days
+
+    def is_compatible(self, meta, lookback, features):
+        """ Whether a stored model was built for the same window length and input columns. """
+        return meta.get('lookback') == lookback and meta.get('features', ['Close']) == list(features)
+
+    def lookup(self, ticker, df, lookback, features=('Close',)):
+        """
+        Return (model, scaler, meta) for the best usable model, or None.
+        An exact fingerprint match is always reused. For a known ticker the most
+        recent model is also reused for newer data until it goes stale.
+        """
+        if ticker and not is_valid_ticker(ticker):
+            return None
+        fingerprint = data_fingerprint(df)
+        model_path, scaler_path, meta_path = self._paths(ticker, fingerprint)
+        meta = self._read_meta(meta_path)
+
+        if meta is None and ticker:
+            latest = self._read_meta(os.path.join(self._ticker_dir(ticker), 'latest.json'))
+            if latest and not self.is_stale(latest, pd.to_datetime(df['Date']).max()):
+                meta = latest
+                model_path, scaler_path, meta_path = self._paths(ticker, latest['fingerprint'])
+
+        if meta is None or not self.is_compatible(meta, lookback, features) or not os.path.exists(model_path):
+            return None
+
+        from keras.models import load_model
+        return load_model(model_path), joblib.load(scaler_path), meta
+
+    def latest_meta(self, ticker):
+        """ Metadata of the most recently saved model of `ticker`, without loading it. """
+        if not is_valid_ticker(ticker):
+            return None
+        return self._read_meta(os.path.join(self._ticker_dir(ticker), 'latest.json'))
+
+    def latest(self, ticker):
+        """ Return (model, scaler, meta) for the most recently saved model of `ticker`, or None. """
+        meta = self.latest_meta(ticker)
+        if meta is None:
+            return None
+        model_path, scaler_path, _ = self._paths(ticker, meta['fingerprint'])
+        if not os.path.exists(model_path):
+            return None
+        from keras.models import load_model
+        return load_model(model_path), joblib.load(scaler_path), meta
+
+    def save(self, ticker, df, model, scaler, lookback, **extra):
+        """
+        Store a model trained on `df`. Only call this for history the server
+        fetched itself: the saved model is reused for every client of `ticker`.
+        Raises ValueError for a ticker that doesn't match TICKER_PATTERN.
+        """
+        fingerprint = data_fingerprint(df)
+        model_path, scaler_path, meta_path = self._paths(ticker, fingerprint)
+        meta = {
+            'ticker': ticker,
+            'fingerprint': fingerprint,
+            'lookback': lookback,
+            'rows': len(df),
+            'last_date': pd.to_datetime(df['Date']).max().strftime('%Y-%m-%d'),
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            **extra,
+        }
+        with self._lock:
+            os.makedirs(self._ticker_dir(ticker), exist_ok=True)
+            model.save(model_path)
+            joblib.dump(scaler, scaler_path)
+            for path in (meta_path, os.path.join(self._ticker_dir(ticker), 'latest.json')):
+                with open(path + '.tmp', 'w') as f:
+                    json.dump(meta, f)
+                os.replace(path + '.tmp', path)
+            self._prune(ticker, fingerprint)
+        return meta
+
+    def _prune(self, ticker, keep_fingerprint):
+        """ Delete all but the keep_per_ticker most recently saved models of `ticker`. """
+        ticker_dir = self._ticker_dir(ticker)
+        metas = [os.path.join(ticker_dir, name) for name in os.listdir(ticker_dir)
+                 if name.endswith('.json') and name != 'latest.json']
+        metas.sort(key=os.path.getmtime, reverse=True)
+        for meta_path in metas[self.keep_per_ticker:]:
+            fingerprint = os.path.basename(meta_path)[:-len('.json')]
+            if fingerprint == keep_fingerprint:
+                continue
+            # Metadata goes first, so a half-pruned model is never picked up by lookup()
+            for path in (meta_path, *self._paths(ticker, fingerprint)[:2]):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+registry = ModelRegistry()
@@ -0,0 +1,260 @@
+import os
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pandas as pd
+import yfinance as yf
+from cache import TTLCache
+from market_hours import last_close, last_open, now_ist
+from metrics import track_upstream
+from quote_cache import QUOTE_TTL_OPEN, quote_ttl
+
+# Daily bars for past dates never change, so each ticker is kept on disk as a
+# Parquet file and only the missing date range is fetched from Yahoo.
+STORE_DIR = os.environ.get('OHLCV_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ohlcv'))
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# How long after the NSE close a day's bar is treated as final
+BAR_SETTLE_MINUTES = int(os.environ.get('BAR_SETTLE_MINUTES', 30))
+
+NSE_SUFFIXES = ('.NS', '.BO')
+
+# Bars that may still be forming are kept briefly in memory instead of being
+# downloaded on every read; tickers off the NSE calendar use this fixed TTL
+LIVE_BAR_TTL = float(os.environ.get('LIVE_BAR_TTL', QUOTE_TTL_OPEN))
+
+# A ticker with nothing stored whose download came back empty (unknown, delisted,
+# or Yahoo failing) isn't asked for again for this long. No coverage is saved for
+# it, so a transient failure doesn't permanently hide the ticker's history.
+MISSING_TICKER_TTL = float(os.environ.get('MISSING_TICKER_TTL', 3600))
+
+
+def _to_date(value):
+    """ Normalise a date string / datetime to a midnight Timestamp. """
+    return pd.Timestamp(value).normalize()
+
+
+def _on_exchange_calendar(ticker):
+    return ticker.endswith(NSE_SUFFIXES) or ticker.startswith('^')
+
+
+def persist_end(ticker):
+    """
+    First date whose bar may still change. NSE/BSE tickers and Indian indices follow
+    the exchange calendar, so a session's bar is final shortly after the close;
+    anything else is only treated as final from the next calendar day.
+    """
+    if _on_exchange_calendar(ticker):
+        settled = last_close(now_ist() - timedelta(minutes=BAR_SETTLE_MINUTES))
+        return pd.Timestamp(settled.date()) + pd.Timedelta(days=1)
+    return _to_date(datetime.now())
+
+
+def live_session_started(ticker, live_from):
+    """
+    Whether a bar dated `live_from` or later can exist yet. On the exchange
+    calendar that needs a session to have opened since the last persisted one;
+    for other tickers it can't be ruled out.
+    """
+    if _on_exchange_calendar(ticker):
+        return pd.Timestamp(last_open().date()) >= live_from
+    return True
+
+
+class OHLCVStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._live = TTLCache(maxsize=5000, ttl=LIVE_BAR_TTL, name='live_bars')
+        self._misses = TTLCache(maxsize=5000, ttl=MISSING_TICKER_TTL, name='ohlcv_misses')
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _paths(self, ticker):
+        name = ticker.replace('^', '_').replace('/', '_')
+        base = os.path.join(self.store_dir, name)
+        return base + '.parquet', base + '.json'
+
+    def _load(self, ticker):
+        data_path, meta_path = self._paths(ticker)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return pd.read_parquet(data_path), meta
+
+    def _save(self, ticker, data, meta):
+        data_path, meta_path = self._paths(ticker)
+        # Write to temp files and rename so readers never see a half-written file
+        data.to_parquet(data_path + '.tmp')
+        os.replace(data_path + '.tmp', data_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _download_many(self, tickers, start, end):
+        """ Bars for several tickers in one grouped yf.download, as {ticker: DataFrame}. """
+        with track_upstream('yfinance', 'download'):
+            data = yf.download(
+                list(tickers), start=start.strftime(DATE_FORMAT), end=end.strftime(DATE_FORMAT),
+                group_by='ticker', progress=False, threads=True,
+            )
+        frames = {}
+        for ticker in tickers:
+            if data.empty:
+                frame = pd.DataFrame()
+            elif isinstance(data.columns, pd.MultiIndex):
+                # Grouped columns are (Ticker, Price)
+                frame = data[ticker].copy() if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+            else:
+                # Older yfinance returns flat columns for a single ticker
+                frame = data.copy()
+            frame = frame.dropna(how='all')
+            if not frame.empty:
+                frame.columns = [str(c) for c in frame.columns]
+                frame.columns.name = None
+                frame.index = pd.to_datetime(frame.index).tz_localize(None).normalize()
+                frame.index.name = 'Date'
+            frames[ticker] = frame
+        return frames
+
+    @staticmethod
+    def _missing_ranges(start, persist_until, meta):
+        if start >= persist_until:
+            return []
+        if meta is None:
+            return [(start, persist_until)]
+        covered_start = _to_date(meta['start'])
+        covered_end = _to_date(meta['end'])
+        missing = []
+        if start < covered_start:
+            missing.append((start, covered_start))
+        if persist_until > covered_end:
+            missing.append((covered_end, persist_until))
+        return missing
+
+    def _merge_and_save(self, ticker, stored, meta, fetched, start, persist_until):
+        frames = [f for f in [stored] + fetched if f is not None and not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        merged = pd.concat(frames)
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        # Coverage is tracked separately from the bars so ranges that
+        # were fetched but had no trading days aren't asked for again
+        new_start = start if meta is None else min(start, _to_date(meta['start']))
+        new_end = persist_until if meta is None else max(persist_until, _to_date(meta['end']))
+        self._save(ticker, merged, {
+            'start': new_start.strftime(DATE_FORMAT),
+            'end': new_end.strftime(DATE_FORMAT),
+        })
+        return merged
+
+    def get_many(self, tickers, start_date, end_date):
+        """
+        Return {ticker: daily bars in [start_date, end_date)}, fetching only the
+        parts of the range that aren't stored yet. Tickers missing the same range
+        share one grouped download. Bars that may still be forming (see
+        persist_end) are never persisted; they come from a short-lived cache of
+        live downloads (see _live_bars).
+        """
+        start = _to_date(start_date)
+        end = _to_date(end_date)
+        tickers = list(dict.fromkeys(tickers))
+        live_from = {ticker: persist_end(ticker) for ticker in tickers}
+
+        # Sorted acquisition so concurrent batch requests can't deadlock
+        locks = [self._lock(ticker) for ticker in sorted(tickers)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            stored, metas = {}, {}
+            wanted = defaultdict(list)  # (range start, range end) -> tickers missing it
+            for ticker in tickers:
+                stored[ticker], metas[ticker] = self._load(ticker)
+                for missing in self._missing_ranges(start, min(end, live_from[ticker]), metas[ticker]):
+                    if metas[ticker] is None and self._misses.get((ticker, *missing)):
+                        continue
+                    wanted[missing].append(ticker)
+
+            fetched = defaultdict(list)
+            for (range_start, range_end), group in wanted.items():
+                for ticker, frame in self._download_many(group, range_start, range_end).items():
+                    fetched[ticker].append(frame)
+                    if frame.empty and metas[ticker] is None:
+                        self._misses.set((ticker, range_start, range_end), True)
+
+            results = {}
+            for ticker in tickers:
+                if ticker in fetched:
+                    results[ticker] = self._merge_and_save(
+                        ticker, stored[ticker], metas[ticker], fetched[ticker], start, min(end, live_from[ticker]))
+                else:
+                    results[ticker] = stored[ticker] if stored[ticker] is not None else pd.DataFrame()
+        finally:
+            for lock in locks:
+                lock.release()
+
+        for ticker, live in self._live_bars([t for t in tickers if end > live_from[t]], live_from).items():
+            if not live.empty:
+                data = results[ticker]
+                results[ticker] = pd.concat([data, live]) if not data.empty else live
+
+        for ticker, data in results.items():
+            if not data.empty:
+                data = data[~data.index.duplicated(keep='last')].sort_index()
+                results[ticker] = data[(data.index >= start) & (data.index < end)]
+        return results
+
+    def _live_bars(self, tickers, live_from):
+        """
+        {ticker: bars from live_from[ticker] up to today}. Nothing is fetched
+        when no session has opened since the last persisted bar; otherwise a
+        download is reused for the quote TTL (or LIVE_BAR_TTL off the NSE calendar).
+        """
+        live, missing = {}, defaultdict(list)
+        for ticker in tickers:
+            if not live_session_started(ticker, live_from[ticker]):
+                continue
+            cached = self._live.get((ticker, live_from[ticker]))
+            if cached is not None:
+                live[ticker] = cached
+            else:
+                missing[live_from[ticker]].append(ticker)
+
+        until = _to_date(datetime.now()) + pd.Timedelta(days=1)
+        for live_start, group in missing.items():
+            fetched = self._download_many(group, live_start, max(until, live_start + pd.Timedelta(days=1)))
+            for ticker in group:
+                bars = fetched.get(ticker, pd.DataFrame())
+                ttl = quote_ttl() if _on_exchange_calendar(ticker) else None
+                self._live.set((ticker, live_start), bars, ttl=ttl)
+                live[ticker] = bars
+        return live
+
+    def get(self, ticker, start_date, end_date):
+        """ Daily bars for one ticker in [start_date, end_date); see get_many. """
+        return self.get_many([ticker], start_date, end_date)[ticker]
+
+
+store = OHLCVStore()
+
+
+def get_history(ticker, start_date, end_date):
+    return store.get(ticker, start_date, end_date)
+
+
+def get_histories(tickers, start_date, end_date):
+    return store.get_many(tickers, start_date, end_date)
+
+
+def get_recent_history(ticker, years=2):
+    """ Last `years` of daily bars up to now, as used by the prediction page. """
+    now = datetime.now()
+    start = datetime(now.year - years, now.month, now.day)
+    return store.get(ticker, start, now + timedelta(days=1))
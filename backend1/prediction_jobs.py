@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+import logging
+import hashlib
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from metrics import model_duration
+from model_registry import data_fingerprint
+
+# Prediction jobs run in a small process pool so Keras training never occupies a
+# web worker. Job state lives in JSON files, so any gunicorn worker can answer a
+# status poll and identical submissions from different workers are deduplicated.
+# Each gunicorn worker owns its own pool, so up to PREDICTION_WORKERS jobs train
+# per web worker (workers x PREDICTION_WORKERS overall), not across the server.
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jobs'))
+PREDICTION_WORKERS = int(os.environ.get('PREDICTION_WORKERS', 2))
+JOB_TTL_SECONDS = int(os.environ.get('JOB_TTL_SECONDS', 24 * 3600))
+# A key file still empty after this long belongs to a submitter that died mid-claim
+CLAIM_TIMEOUT = float(os.environ.get('JOB_CLAIM_TIMEOUT', 10))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def parse_stock_data(data):
+    """ Validate a /predict payload and return its 'stockData' as a DataFrame. Raises ValueError. """
+    if not data or 'stockData' not in data:
+        raise ValueError("Missing 'stockData' in request")
+
+    # Validate data
+    stock_data = pd.DataFrame(data['stockData'])
+    if not all(col in stock_data.columns for col in ['Date', 'Close']):
+        raise ValueError("Required columns 'Date' and 'Close' are missing or misnamed")
+
+    # Ensure Date is in datetime format
+    stock_data['Date'] = pd.to_datetime(stock_data['Date'], errors='coerce')
+    if stock_data['Date'].isnull().any():
+        raise ValueError("Invalid Date values in data")
+    return stock_data
+
+
+def build_prediction_response(stock_data, lstm_prediction, lstm_error, df1, df2):
+    lstm_prediction = float(lstm_prediction)
+    lstm_error = str(lstm_error) if lstm_error else None
+
+    # Convert data for JSON response
+    actual_data = df1.get("Actual Data", []).tolist()
+    predicted_data = df1.get("Predicted", []).tolist()
+
+    # Handle df2 as a NumPy array
+    if isinstance(df2, np.ndarray):
+        volume_data = df2.flatten().tolist()  # Flatten the NumPy array and convert to list
+    else:
+        volume_data = df2.values.flatten().tolist()  # Fallback for Pandas DataFrame
+
+    return {
+        "LSTM": {"prediction": lstm_prediction, "error": lstm_error},
+        "original": {
+            "dates": stock_data['Date'].dt.strftime('%Y-%m-%d').tolist(),
+            "prices": stock_data['Close'].tolist()
+        },
+        "comparision": {
+            "Actual": actual_data,
+            "Predicted": predicted_data
+        },
+        "Volume": {
+            "df2": volume_data
+        }
+    }
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _key_path(job_key):
+    return os.path.join(JOBS_DIR, f"key-{job_key}")
+
+
+def _write_job(job):
+    path = _job_path(job['id'])
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp, path)
+
+
+def _update_job(job_id, **fields):
+    job = get_job(job_id) or {'id': job_id}
+    job.update(fields)
+    job['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    _write_job(job)
+    return job
+
+
+def get_job(job_id):
+    """ Current state of a job, or None if it doesn't exist. """
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _run_job(job_id, records, ticker, store=False):
+    """
+    Runs inside a pool process: train/predict and record progress and result.
+    Returns the time taken, so the parent process can record it. The trained
+    model is only saved to the registry with `store` (see submit_job).
+    """
+    from keras.callbacks import Callback
+    from stock_prediction_models import LSTM_ALGO
+
+    class ProgressCallback(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            _update_job(job_id, progress={
+                'epoch': epoch + 1,
+                'epochs': self.params.get('epochs'),
+                'loss': float((logs or {}).get('loss', float('nan'))),
+            })
+
+    _update_job(job_id, status='running', started_at=datetime.now().isoformat(timespec='seconds'))
+    started = time.perf_counter()
+    try:
+        stock_data = parse_stock_data({'stockData': records})
+        lstm_prediction, lstm_error, df1, df2 = LSTM_ALGO(stock_data, ticker=ticker, callbacks=[ProgressCallback()], store=store)
+        result = build_prediction_response(stock_data, lstm_prediction, lstm_error, df1, df2)
+        _update_job(job_id, status='done', result=result)
+    except Exception as e:
+        logger.exception("Prediction job failed", extra={'job_id': job_id, 'ticker': ticker})
+        _update_job(job_id, status='failed', error=str(e))
+    return time.perf_counter() - started
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers start clean instead of inheriting the web process's
+            # sockets and threads, and import TensorFlow only for themselves
+            _executor = ProcessPoolExecutor(
+                max_workers=PREDICTION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _discard_executor(broken):
+    """ Drop a pool that broke (a worker died, e.g. OOM) so the next submit starts a new one. """
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def _submit(*args):
+    """ (future, executor) for running `args` in the pool, replacing the pool once if it is broken. """
+    executor = _get_executor()
+    try:
+        return executor.submit(*args), executor
+    except BrokenProcessPool:
+        logger.warning("Prediction pool was broken, starting a new one")
+        _discard_executor(executor)
+        executor = _get_executor()
+        return executor.submit(*args), executor
+
+
+def _purge_old_jobs():
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _claim_is_stale(key_path):
+    try:
+        return time.time() - os.path.getmtime(key_path) > CLAIM_TIMEOUT
+    except FileNotFoundError:
+        return False
+
+
+def _release_claim(key_path):
+    try:
+        os.remove(key_path)
+    except FileNotFoundError:
+        pass
+
+
+def submit_job(data, store=False):
+    """
+    Queue a prediction for a /predict-style payload. Returns (job, deduplicated).
+    A job for the same ticker and data that is still queued, running or done is
+    returned instead of starting another one. Only pass `store=True` for history
+    the server fetched itself: the trained model is then saved for every user.
+    """
+    stock_data = parse_stock_data(data)
+    ticker = data.get('ticker')
+    # Stored and client jobs never share a key, so a client job can't stand in for a stored one
+    job_key = hashlib.sha1(f"{ticker}:{data_fingerprint(stock_data)}:{int(store)}".encode()).hexdigest()[:20]
+
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    _purge_old_jobs()
+
+    key_path = _key_path(job_key)
+    while True:
+        try:
+            # O_EXCL makes the key file a cross-process claim on this ticker/data
+            fd = os.open(key_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            with open(key_path) as f:
+                existing_id = f.read().strip()
+            existing = get_job(existing_id) if existing_id else None
+            if existing and existing.get('status') != 'failed':
+                return existing, True
+            if existing_id or _claim_is_stale(key_path):
+                # Failed or vanished job, or a claimant that died: release the claim and try again
+                _release_claim(key_path)
+            else:
+                # Another process holds the claim but hasn't written the job id yet
+                time.sleep(0.05)
+            continue
+        break
+
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'ticker': ticker,
+        'status': 'queued',
+        'progress': {},
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _write_job(job)
+    with os.fdopen(fd, 'w') as f:
+        f.write(job_id)
+
+    records = stock_data.assign(Date=stock_data['Date'].dt.strftime('%Y-%m-%d')).to_dict(orient='records')
+    try:
+        future, executor = _submit(_run_job, job_id, records, ticker, store)
+    except Exception as e:
+        # Don't leave a 'queued' job that never runs for later submissions to latch onto
+        _update_job(job_id, status='failed', error=str(e))
+        _release_claim(key_path)
+        raise
+
+    def on_done(fut):
+        # A crashed worker process never gets to record its own failure
+        if fut.exception() is not None:
+            _update_job(job_id, status='failed', error=str(fut.exception()))
+            if isinstance(fut.exception(), BrokenProcessPool):
+                _discard_executor(executor)
+        else:
+            # Training ran in the pool process; its duration is recorded here
+            model_duration.observe(fut.result(), model='lstm', phase='job')
+
+    future.add_done_callback(on_done)
+    return job, False
+
+
+def stream_job(job_id, interval=0.5):
+    """ Server-sent events with the job's state whenever it changes, until it finishes. """
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        if job != last:
+            yield f"data: {json.dumps(job)}\n\n"
+            last = job
+        if job.get('status') not in ACTIVE_STATUSES:
+            return
+        time.sleep(interval)
@@ -0,0 +1,160 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import wait
+from cache import TTLCache
+from market_hours import is_market_open, seconds_until_next_open
+from metrics import record_cache
+from scraper import scrap, scrape_executor, SCRAPE_TIMEOUT, SCRAPE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Quotes for hot tickers are shared instead of fetched per user: a per-process
+# TTL cache in front of a Mongo collection every worker reads, and concurrent
+# misses for the same key wait on a single upstream fetch (single-flight).
+QUOTE_TTL_OPEN = float(os.environ.get('QUOTE_TTL_OPEN', 10))
+# Once the exchange is closed a quote can't change before the next open; cap it anyway
+QUOTE_TTL_CLOSED_MAX = float(os.environ.get('QUOTE_TTL_CLOSED_MAX', 12 * 3600))
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', 5000))
+
+
+def quote_ttl():
+    if is_market_open():
+        return QUOTE_TTL_OPEN
+    return max(min(seconds_until_next_open(), QUOTE_TTL_CLOSED_MAX), QUOTE_TTL_OPEN)
+
+
+class QuoteCache:
+    def __init__(self, maxsize=QUOTE_CACHE_SIZE):
+        self._local = TTLCache(maxsize=maxsize, ttl=QUOTE_TTL_OPEN, name='quotes')
+        self._shared = None
+        self._shared_index_ready = False
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def configure_shared(self, collection):
+        """ Use `collection` as the cross-worker cache tier. """
+        self._shared = collection
+
+    def _read_shared(self, key):
+        if self._shared is None:
+            return None
+        try:
+            doc = self._shared.find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+        except Exception as e:
+            logger.warning("Error reading quote cache: %s", e)
+            return None
+        record_cache('quotes_shared', doc is not None)
+        if doc is None:
+            return None
+        ttl = (doc['expires_at'] - datetime.utcnow()).total_seconds()
+        self._local.set(key, doc['value'], ttl=ttl)
+        return doc['value']
+
+    def _write_shared(self, key, value, ttl):
+        if self._shared is None:
+            return
+        try:
+            if not self._shared_index_ready:
+                self._shared.create_index('expires_at', expireAfterSeconds=0)
+                self._shared_index_ready = True
+            self._shared.update_one(
+                {'_id': key},
+                {'$set': {'value': value, 'expires_at': datetime.utcnow() + timedelta(seconds=ttl)}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("Error writing quote cache: %s", e)
+
+    def get(self, key):
+        value = self._local.get(key)
+        if value is None:
+            value = self._read_shared(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = quote_ttl() if ttl is None else ttl
+        self._local.set(key, value, ttl=ttl)
+        self._write_shared(key, value, ttl)
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Cached value for `key`, or the result of `fetch()`. Only one caller per
+        key runs `fetch` at a time; the others wait for and share its result.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event(), 'value': None, 'error': None}
+                self._inflight[key] = flight
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            value = self.get(key)  # another flight may have just filled it
+            if value is None:
+                value = fetch()
+                if value is not None:
+                    self.set(key, value)
+            flight['value'] = value
+            return value
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight['done'].set()
+
+
+quotes = QuoteCache()
+
+
+def quote_key(ticker):
+    return f"quote:{ticker}"
+
+
+def index_key(symbol):
+    return f"index:{symbol}"
+
+
+def get_quote(ticker):
+    """ (price, percentage) for an NSE ticker, scraped at most once per TTL across users. """
+    price, percentage = quotes.get_or_fetch(quote_key(ticker), lambda: list(scrap(ticker)))
+    return price, percentage
+
+
+def refresh_quote(ticker):
+    """ Scrape `ticker` now and overwrite its cached quote (used for prefetching). """
+    quotes.set(quote_key(ticker), list(scrap(ticker)))
+
+
+def get_quotes(tickers, timeout=SCRAPE_TIMEOUT * (SCRAPE_RETRIES + 1)):
+    """
+    Quotes for many tickers concurrently through the cache. Returns
+    ({ticker: (price, percentage)}, {ticker: error message}).
+    """
+    futures = {ticker: scrape_executor.submit(get_quote, ticker) for ticker in set(tickers)}
+    wait(futures.values(), timeout=timeout)
+
+    results, errors = {}, {}
+    for ticker, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[ticker] = 'Timed out fetching price'
+            continue
+        try:
+            results[ticker] = future.result()
+        except Exception as e:
+            errors[ticker] = str(e)
+    return results, errors
@@ -0,0 +1,135 @@
+import os
+import json
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from market_hours import is_market_open
+from quote_cache import QUOTE_TTL_OPEN
+
+# Server-push quotes: clients subscribe to tickers/indices and a single poller
+# fetches each subscribed key once per interval (through the shared quote cache)
+# and pushes only the values that changed to every subscriber of that key.
+STREAM_INTERVAL = float(os.environ.get('STREAM_INTERVAL', QUOTE_TTL_OPEN))
+STREAM_CLOSED_INTERVAL = float(os.environ.get('STREAM_CLOSED_INTERVAL', 60))
+STREAM_KEEPALIVE = float(os.environ.get('STREAM_KEEPALIVE', 15))
+STREAM_QUEUE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, hub, keys):
+        self.hub = hub
+        self.keys = set(keys)
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    def push(self, changes):
+        try:
+            self.queue.put_nowait(changes)
+        except queue.Full:
+            # Slow client: drop its oldest pending update rather than block the poller
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(changes)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class QuoteHub:
+    def __init__(self, fetchers):
+        """ `fetchers` maps a key kind (e.g. 'quote', 'index') to a function name -> value. """
+        self.fetchers = fetchers
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self._subscribers = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self, keys):
+        """ Subscribe to (kind, name) keys; the first update is a snapshot of known values. """
+        subscription = Subscription(self, keys)
+        with self._lock:
+            self._subscribers.add(subscription)
+            snapshot = {key: self._latest[key] for key in subscription.keys if key in self._latest}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_loop, name='quote-stream', daemon=True)
+                self._thread.start()
+        if snapshot:
+            subscription.push(snapshot)
+        self._wakeup.set()  # fetch keys nobody was watching yet without waiting a full interval
+        return subscription
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            watched = set().union(*(s.keys for s in self._subscribers)) if self._subscribers else set()
+            for key in list(self._latest):
+                if key not in watched:
+                    del self._latest[key]
+
+    def _fetch(self, key):
+        kind, name = key
+        try:
+            return self.fetchers[kind](name)
+        except Exception as e:
+            return {'error': str(e)}
+
+    def poll_once(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        keys = sorted(set().union(*(s.keys for s in subscribers))) if subscribers else []
+        if not keys:
+            return
+
+        changes = {}
+        for key, value in zip(keys, self.executor.map(self._fetch, keys)):
+            with self._lock:
+                if self._latest.get(key) != value:
+                    self._latest[key] = value
+                    changes[key] = value
+
+        if changes:
+            for subscription in subscribers:
+                delta = {key: value for key, value in changes.items() if key in subscription.keys}
+                if delta:
+                    subscription.push(delta)
+
+    def _poll_loop(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Quote stream error")
+            self._wakeup.clear()
+            self._wakeup.wait(STREAM_INTERVAL if is_market_open() else STREAM_CLOSED_INTERVAL)
+
+
+def format_event(changes):
+    """ SSE message grouping changed values by kind: {"quote": {...}, "index": {...}}. """
+    payload = {}
+    for (kind, name), value in changes.items():
+        payload.setdefault(kind, {})[name] = value
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def event_stream(subscription):
+    """ Yield SSE messages for `subscription` until the client disconnects. """
+    try:
+        while True:
+            try:
+                changes = subscription.queue.get(timeout=STREAM_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(changes)
+    finally:
+        subscription.close()
@@ -0,0 +1,34 @@
+import sys
+import time
+from ohlcv_store import get_recent_history
+from stock_prediction_models import LSTM_ALGO
+
+# Nightly model refresh: python refresh_models.py RELIANCE.NS TCS.NS ...
+# Each ticker's stored LSTM is fine-tuned on the bars added since it was last
+# trained, or fully retrained when there is no model or the fine-tune regresses.
+
+
+def refresh_model(ticker):
+    data = get_recent_history(ticker)
+    if data.empty:
+        return {'ticker': ticker, 'error': 'No data found for ticker'}
+
+    df = data.reset_index()[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    started = time.perf_counter()
+    _, _, _, _, report = LSTM_ALGO(df, ticker=ticker, incremental=True, return_report=True)
+    report['ticker'] = ticker
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return report
+
+
+if __name__ == '__main__':
+    tickers = sys.argv[1:]
+    if not tickers:
+        print("Usage: python refresh_models.py TICKER [TICKER ...]")
+        sys.exit(1)
+
+    for ticker in tickers:
+        try:
+            print(refresh_model(ticker))
+        except Exception as e:
+            print({'ticker': ticker, 'error': str(e)})
@@ -0,0 +1,120 @@
+import os
+import time
+import fcntl
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from market_hours import IST, MARKET_CLOSE, is_market_open, is_trading_day, next_open, now_ist
+from ohlcv_store import get_recent_history, BAR_SETTLE_MINUTES
+from quote_cache import quotes, index_key, refresh_quote, QUOTE_TTL_OPEN
+
+# Background prefetching so user requests find warm caches. During the NSE session
+# index prices and watchlisted quotes are refreshed just before they expire; once
+# the day's bars have settled after the close they are pulled into the OHLCV
+# store. Nothing is fetched while the exchange is closed. Only one process (the
+# one holding the lock file) runs the scheduler when several workers start it.
+PREFETCH_INTERVAL = float(os.environ.get('PREFETCH_INTERVAL', max(QUOTE_TTL_OPEN - 2, 1)))
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', 8))
+LOCK_PATH = os.environ.get('PREFETCH_LOCK', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prefetch.lock'))
+
+# Longest single sleep while closed, so clock or calendar changes are noticed
+MAX_IDLE_SLEEP = 15 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    def __init__(self, watchlist, index_symbols, fetch_index_prices):
+        self.watchlist = watchlist
+        self.index_symbols = list(index_symbols)
+        self.fetch_index_prices = fetch_index_prices
+        self.executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+        self._bars_done_for = None
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _acquire_leadership(self):
+        if self._lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+        lock_file = open(LOCK_PATH, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def watchlisted_tickers(self):
+        """ NSE symbols present in any user's watchlist. """
+        return [ticker for ticker in self.watchlist.distinct('Stock') if ticker]
+
+    def _refresh_index(self, symbol):
+        prices = self.fetch_index_prices(symbol)
+        if prices is not None:
+            quotes.set(index_key(symbol), prices)
+
+    def _run_all(self, fn, items):
+        for item, error in zip(items, self.executor.map(lambda i: self._safe(fn, i), items)):
+            if error:
+                logger.warning("Prefetch failed", extra={'item': item, 'error': error})
+
+    @staticmethod
+    def _safe(fn, item):
+        try:
+            fn(item)
+        except Exception as e:
+            return str(e)
+        return None
+
+    def prefetch_quotes(self):
+        self._run_all(self._refresh_index, self.index_symbols)
+        self._run_all(refresh_quote, self.watchlisted_tickers())
+
+    def prefetch_bars(self):
+        tickers = self.index_symbols + [f"{ticker}.NS" for ticker in self.watchlisted_tickers()]
+        self._run_all(get_recent_history, tickers)
+
+    def run_once(self, now=None):
+        """ Do whatever is due at `now`; returns how long to sleep before the next run. """
+        now = now or now_ist()
+        if is_market_open(now):
+            self.prefetch_quotes()
+            return PREFETCH_INTERVAL
+
+        today = now.date()
+        bars_ready_at = datetime.combine(today, MARKET_CLOSE, tzinfo=IST) + timedelta(minutes=BAR_SETTLE_MINUTES)
+        if is_trading_day(today) and now >= bars_ready_at and self._bars_done_for != today:
+            self.prefetch_bars()
+            self._bars_done_for = today
+
+        # Closed: sleep until the next open or until today's bars settle, whichever is first
+        wake_at = next_open(now)
+        if is_trading_day(today) and self._bars_done_for != today and now < bars_ready_at:
+            wake_at = min(wake_at, bars_ready_at)
+        return min(max((wake_at - now).total_seconds(), 1), MAX_IDLE_SLEEP)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self._acquire_leadership():
+                # Another worker is prefetching; check again later in case it exits
+                self._stop.wait(60)
+                continue
+            started = time.monotonic()
+            try:
+                delay = self.run_once()
+            except Exception:
+                logger.exception("Prefetch error")
+                delay = 60
+            self._stop.wait(max(delay - (time.monotonic() - started), 0))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='prefetch-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,124 @@
+import os
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+from metrics import track_upstream, upstream_errors
+
+# Google Finance scraping client: one pooled keep-alive session shared by all
+# requests, with timeouts and retries, and parsers that only build the few
+# subtrees we read instead of the whole page.
+SCRAPE_TIMEOUT = float(os.environ.get('SCRAPE_TIMEOUT', 5))
+SCRAPE_RETRIES = int(os.environ.get('SCRAPE_RETRIES', 2))
+SCRAPE_POOL_SIZE = int(os.environ.get('SCRAPE_POOL_SIZE', 32))
+SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 16))
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+PRICE_CLASS = 'YMlKec fxKbKc'
+PERCENTAGE_CLASS = 'JwB6zf'
+NEWS_CLASS = 'z4rs2b'
+
+# Only these elements (and their children) are parsed out of the page
+QUOTE_STRAINER = SoupStrainer(class_=[PRICE_CLASS, PERCENTAGE_CLASS])
+NEWS_STRAINER = SoupStrainer(class_=NEWS_CLASS)
+
+
+def _make_session():
+    retry = Retry(
+        total=SCRAPE_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SCRAPE_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': 'Mozilla/5.0', 'Accept-Language': 'en'})
+    return session
+
+
+session = _make_session()
+scrape_executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS)
+
+
+def fetch_page(url, operation='page'):
+    with track_upstream('google_finance', operation):
+        response = session.get(url, timeout=SCRAPE_TIMEOUT)
+    if response.status_code >= 400:
+        upstream_errors.inc(upstream='google_finance', operation=operation)
+    return response
+
+
+def parse_quote(html):
+    """ (price, percentage) from a Google Finance quote page. """
+    soup = BeautifulSoup(html, PARSER, parse_only=QUOTE_STRAINER)
+
+    # Extract current price
+    price_element = soup.find(class_=PRICE_CLASS)
+    if price_element:
+        price = price_element.text.strip()[1:].replace(",", "")
+        try:
+            price = float(price)
+        except ValueError:
+            raise Exception('Failed to parse price')
+    else:
+        raise Exception('Price element not found')
+
+    # Extract percentage change
+    percentage_element = soup.find(class_=PERCENTAGE_CLASS)
+    if percentage_element:
+        percentage = percentage_element.text
+    else:
+        raise Exception('Percentage element not found')
+
+    return price, percentage
+
+
+def parse_news(html):
+    soup = BeautifulSoup(html, PARSER, parse_only=NEWS_STRAINER)
+
+    # Find all news items with the specified class
+    news_items = soup.find_all(class_=NEWS_CLASS)
+
+    news_data = []
+
+    for item in news_items:
+        link = item.find('a', href=True)
+        source = item.find(class_="sfyJob")
+        time = item.find(class_="Adak")
+        new = item.find(class_="Yfwt5")
+
+        if link and source and time and new:
+            news_link = link['href']
+            news_data.append({
+                "source": source.text,
+                "time": time.text,
+                "news": new.text.strip(),
+                "link": news_link
+            })
+
+    return news_data
+
+
+def scrap(ticker):
+    url = f'https://www.google.com/finance/quote/{ticker}:NSE'
+    response = fetch_page(url, 'quote')
+    if response.status_code != 200:
+        raise Exception('Failed to fetch data from Google Finance')
+    return parse_quote(response.text)
+
+
+def get_news(ticker):
+    if ticker.endswith('.NS'):
+        ticker = ticker[:-3]
+    url = f"https://www.google.com/finance/quote/{ticker}:NSE?hl=en"
+    response = fetch_page(url, 'news')
+    return parse_news(response.text)
+
@@ -0,0 +1,99 @@
+import os
+import logging
+import hashlib
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from cache import TTLCache
+from metrics import cache_requests
+from ml_models import analyze_sentiment
+
+logger = logging.getLogger(__name__)
+
+# Headline sentiment is cached by headline hash: first in a per-process LRU, then
+# in a Mongo collection (expired by a TTL index) that every worker shares.
+SENTIMENT_CACHE_TTL = int(os.environ.get('SENTIMENT_CACHE_TTL', 7 * 24 * 3600))
+SENTIMENT_CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', 10000))
+
+DEFAULT_SENTIMENT = "Neutral"
+
+_local_cache = TTLCache(maxsize=SENTIMENT_CACHE_SIZE, ttl=SENTIMENT_CACHE_TTL, name='sentiment')
+_shared_cache = None
+_shared_index_ready = False
+
+
+def configure_shared_cache(collection):
+    """ Use `collection` as the cross-worker cache tier. """
+    global _shared_cache
+    _shared_cache = collection
+
+
+def _ensure_shared_index():
+    # Created on first write rather than at import so startup never waits on Mongo
+    global _shared_index_ready
+    if not _shared_index_ready:
+        _shared_cache.create_index('expires_at', expireAfterSeconds=0)
+        _shared_index_ready = True
+
+
+def headline_key(text):
+    return hashlib.sha1(text.strip().encode('utf-8')).hexdigest()
+
+
+def score_headlines(texts):
+    """
+    Sentiment label for each headline in `texts`, in order. Cached headlines skip
+    inference; all the rest are scored in a single batched pipeline call.
+    """
+    keys = [headline_key(text) for text in texts]
+    labels = {}
+
+    for key in set(keys):
+        label = _local_cache.get(key)
+        if label is not None:
+            labels[key] = label
+
+    missing = [key for key in set(keys) if key not in labels]
+    if missing and _shared_cache is not None:
+        try:
+            now = datetime.utcnow()
+            found = 0
+            for doc in _shared_cache.find({'_id': {'$in': missing}, 'expires_at': {'$gt': now}}):
+                labels[doc['_id']] = doc['label']
+                _local_cache.set(doc['_id'], doc['label'])
+                found += 1
+            cache_requests.inc(found, cache='sentiment_shared', result='hit')
+            cache_requests.inc(len(missing) - found, cache='sentiment_shared', result='miss')
+        except Exception as e:
+            logger.warning("Error reading sentiment cache: %s", e)
+
+    to_score = {}
+    for key, text in zip(keys, texts):
+        if key not in labels:
+            to_score.setdefault(key, text)
+
+    if to_score:
+        try:
+            results = analyze_sentiment(list(to_score.values()))
+        except Exception as e:
+            logger.exception("Error analyzing sentiment: %s", e)
+            results = None
+
+        if results is not None:
+            expires_at = datetime.utcnow() + timedelta(seconds=SENTIMENT_CACHE_TTL)
+            writes = []
+            for key, result in zip(to_score, results):
+                labels[key] = result["label"]
+                _local_cache.set(key, result["label"])
+                writes.append(UpdateOne(
+                    {'_id': key},
+                    {'$set': {'label': result["label"], 'expires_at': expires_at}},
+                    upsert=True,
+                ))
+            if writes and _shared_cache is not None:
+                try:
+                    _ensure_shared_index()
+                    _shared_cache.bulk_write(writes, ordered=False)
+                except Exception as e:
+                    logger.warning("Error writing sentiment cache: %s", e)
+
+    return [labels.get(key, DEFAULT_SENTIMENT) for key in keys]
@@ -0,0 +1,118 @@
+import gzip
+import json
+import hashlib
+import pandas as pd
+from flask import Response, request
+
+# Response encoding for the time-series endpoints. Besides the default
+# row-per-record JSON, clients can opt into a columnar layout (one array per
+# column) as JSON, MessagePack or Arrow, via ?format= or the Accept header.
+# Bodies are compressed per Accept-Encoding and carry an ETag, so repeated
+# requests for unchanged data get a 304 without a body.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+FORMATS = {
+    'records': JSON_MIMETYPE,
+    'columnar': JSON_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+    'arrow': ARROW_MIMETYPE,
+}
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def negotiate_format():
+    """ Requested format name: ?format= wins, then the Accept header, else 'records'. """
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt
+    accept = request.accept_mimetypes
+    if pa is not None and accept[ARROW_MIMETYPE] > accept[JSON_MIMETYPE]:
+        return 'arrow'
+    if msgpack is not None and max(accept[MSGPACK_MIMETYPE], accept['application/x-msgpack']) > accept[JSON_MIMETYPE]:
+        return 'msgpack'
+    return 'records'
+
+
+def to_columns(df, date_format='%Y-%m-%d'):
+    """ {'columns': [...], 'data': {column: [values]}} with dates as strings and NaN as None. """
+    data = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime(date_format).tolist()
+        else:
+            values = series.astype(object).where(series.notna(), None).tolist()
+        data[str(column)] = values
+    return {'columns': [str(c) for c in df.columns], 'data': data}
+
+
+def _encode(df, fmt, records):
+    if fmt == 'records':
+        body = records()
+        return body.encode('utf-8') if isinstance(body, str) else body
+    if fmt == 'columnar':
+        return json.dumps(to_columns(df), separators=(',', ':')).encode('utf-8')
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ValueError('MessagePack is not available on this server')
+        return msgpack.packb(to_columns(df), use_bin_type=True)
+    if fmt == 'arrow':
+        if pa is None:
+            raise ValueError('Arrow is not available on this server')
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+
+def _compress(body):
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return brotli.compress(body, quality=5), 'br'
+    if accept['gzip']:
+        # mtime=0 keeps the output (and so the ETag) stable for the same data
+        return gzip.compress(body, compresslevel=6, mtime=0), 'gzip'
+    return body, None
+
+
+def frame_response(df, records):
+    """
+    Response for a DataFrame in the negotiated format. `records` builds the
+    endpoint's original record-per-row body and is only called for 'records'.
+    Raises ValueError for an unknown or unavailable format.
+    """
+    fmt = negotiate_format()
+    body = _encode(df, fmt, records)
+    etag = hashlib.sha1(body).hexdigest()
+    body, encoding = _compress(body)
+
+    response = Response(body, mimetype=FORMATS[fmt])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        etag = f"{etag}-{encoding}"
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    response.set_etag(etag)
+    return response.make_conditional(request)
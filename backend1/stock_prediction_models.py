@@ -1,3 +1,5 @@
+import os
+import logging
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
@@ -5,45 +7,21 @@ from keras.models import Sequential
 from keras.layers import LSTM, Dropout, Dense
 import math
 from sklearn.metrics import mean_squared_error
+from metrics import model_duration
+from model_registry import registry as default_registry
+from windowing import LOOKBACK, FEATURES, make_supervised
 
-def LSTM_ALGO(df):
-    # Split data into training set and test set
-    train_data = df.iloc[0:int(0.8 * len(df)), :]
-    test_data = df.iloc[int(0.8 * len(df)):, :]
-    
-    # TO PREDICT STOCK PRICES OF NEXT N DAYS, STORE PREVIOUS N DAYS IN MEMORY WHILE TRAINING
-    # HERE N=7
-    training_set = df.iloc[:, 4:5].values  # Selecting 'Close' column as numpy array
-    
-    # Volume data
-    df2 = df['Volume']
-    print(df2)
-    
-    # Feature Scaling
-    sc = MinMaxScaler(feature_range=(0, 1))
-    training_set_scaled = sc.fit_transform(training_set)
-    
-    # Creating data structure with 7 timesteps and 1 output
-    X_train = []  # memory with 7 days from day i
-    y_train = []  # day i
-    for i in range(7, len(training_set_scaled)):
-        X_train.append(training_set_scaled[i-7:i, 0])
-        y_train.append(training_set_scaled[i, 0])
-        
-    # Convert list to numpy arrays
-    X_train = np.array(X_train)
-    y_train = np.array(y_train)
-    
-    X_forecast = np.array(X_train[-1, 1:])
-    X_forecast = np.append(X_forecast, y_train[-1])
-    
-    # Reshaping: Adding 3rd dimension
-    X_train = np.reshape(X_train, (X_train.shape[0], X_train.shape[1], 1))
-    X_forecast = np.reshape(X_forecast, (1, X_forecast.shape[0], 1))
-    
-    # Building the LSTM model
+# Incremental refresh: a few epochs on just the newly appended windows, accepted
+# while the validation RMSE stays within this fraction of the stored model's RMSE
+FINE_TUNE_EPOCHS = int(os.environ.get('FINE_TUNE_EPOCHS', 3))
+FINE_TUNE_TOLERANCE = float(os.environ.get('FINE_TUNE_TOLERANCE', 0.10))
+
+logger = logging.getLogger(__name__)
+
+
+def build_lstm_model(lookback, n_features=1):
     model = Sequential()
-    model.add(LSTM(units=50, return_sequences=True, input_shape=(X_train.shape[1], 1)))
+    model.add(LSTM(units=50, return_sequences=True, input_shape=(lookback, n_features)))
     model.add(Dropout(0.1))
     model.add(LSTM(units=50, return_sequences=True))
     model.add(Dropout(0.1))
@@ -55,69 +33,173 @@ def LSTM_ALGO(df):
     
     # Compile the model
     model.compile(optimizer='adam', loss='mean_squared_error')
-    
-    # Train the model
-    model.fit(X_train, y_train, epochs=25, batch_size=32)
-    
-    # Testing
-    real_stock_price = test_data.iloc[:, 4:5].values
-    
-    # To predict, we need stock prices of 7 days before the test set
-    dataset_total = pd.concat((train_data['Close'], test_data['Close']), axis=0)
-    testing_set = dataset_total[len(dataset_total) - len(test_data) - 7:].values
-    testing_set = testing_set.reshape(-1, 1)
-    
-    # Feature scaling
-    testing_set = sc.transform(testing_set)
-    
-    # Create data structure for testing
-    X_test = []
-    for i in range(7, len(testing_set)):
-        X_test.append(testing_set[i-7:i, 0])
-    
-    # Convert list to numpy arrays
-    X_test = np.array(X_test)
-    
-    # Reshaping: Adding 3rd dimension
-    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
-    
+    return model
+
+
+class LSTMForecaster:
+    """
+    fit/predict wrapper around build_lstm_model on scaled windows, as used by the
+    walk-forward backtest. A warm-started fit continues from the current weights
+    for FINE_TUNE_EPOCHS instead of training a new model.
+    """
+    name = 'lstm'
+
+    def __init__(self, lookback=LOOKBACK, n_features=1, epochs=25, fine_tune_epochs=FINE_TUNE_EPOCHS, batch_size=32):
+        self.lookback = lookback
+        self.n_features = n_features
+        self.epochs = epochs
+        self.fine_tune_epochs = fine_tune_epochs
+        self.batch_size = batch_size
+        self.model = None
+
+    def fit(self, X, y, warm_start=False):
+        if self.model is None or not warm_start:
+            self.model = build_lstm_model(self.lookback, self.n_features)
+            epochs, phase = self.epochs, 'train'
+        else:
+            epochs, phase = self.fine_tune_epochs, 'fine_tune'
+        with model_duration.time(model='lstm', phase=phase):
+            self.model.fit(X, y, epochs=epochs, batch_size=self.batch_size, verbose=0)
+        return self
+
+    def predict(self, X):
+        return np.asarray(self.model.predict_on_batch(X)).reshape(-1)
+
+
+def _inverse_target(sc, values):
+    """ Undo the scaling of the target column (column 0) only. """
+    return (np.asarray(values).reshape(-1, 1) - sc.min_[0]) / sc.scale_[0]
+
+
+def _make_windows(feature_set, split, sc, lookback):
+    """ Scaled train windows/targets, the forecast window and the test windows. """
+    X_all, y_all, X_forecast = make_supervised(sc.transform(feature_set), lookback)
+    # X_all[i] predicts row i + lookback, so test rows split.. come from windows split-lookback..
+    X_test = X_all[split - lookback:]
+    return X_all, y_all, X_forecast, X_test
+
+
+def _evaluate(model, sc, X_test, real_stock_price):
     # Testing Prediction
-    predicted_stock_price = model.predict(X_test)
+    with model_duration.time(model='lstm', phase='infer'):
+        predicted_stock_price = model.predict(X_test)
     
     # Getting original prices back from scaled values
-    predicted_stock_price = sc.inverse_transform(predicted_stock_price)
+    predicted_stock_price = _inverse_target(sc, predicted_stock_price)
     
     # Calculating the error
     error_lstm = math.sqrt(mean_squared_error(real_stock_price, predicted_stock_price))
+    return predicted_stock_price, error_lstm
+
+
+def LSTM_ALGO(df, ticker=None, registry=default_registry, incremental=True, return_report=False, callbacks=None,
+              lookback=LOOKBACK, features=FEATURES, store=True):
+    """
+    Train (or reuse) the LSTM for `df` and forecast the next close.
+    With `incremental`, a stale stored model for `ticker` is warm-started and
+    fine-tuned on the new bars only, falling back to a full retrain when its
+    validation RMSE regresses beyond FINE_TUNE_TOLERANCE. With `return_report`,
+    a dict describing how the model was obtained is returned as a 5th value.
+    `callbacks` are passed to every Keras `fit` call, e.g. to report progress.
+    `features` are the input columns (e.g. ('Close', 'Volume')); the first is forecast.
+    Pass `store=False` for data supplied by a client: stored models are still
+    used, but the model trained here is not saved, so it never reaches other users.
+    """
+    features = list(features)
+    # Split data into training set and test set
+    split = int(0.8 * len(df))
+    
+    feature_set = df[features].to_numpy(dtype=np.float64)
+    real_stock_price = feature_set[split:, :1]  # Actual values of the forecast column
+    
+    # Volume data
+    df2 = df['Volume']
+    
+    report = {'mode': 'full'}
+    model = None
+    
+    # Reuse a stored model (and the scaler it was trained with) when one is still fresh
+    cached = registry.lookup(ticker, df, lookback, features) if registry is not None else None
+    if cached:
+        model, sc, meta = cached
+        report = {'mode': 'cached', 'fingerprint': meta['fingerprint']}
+        logger.info("Using stored model", extra={'ticker': ticker, 'fingerprint': meta['fingerprint'], 'last_date': meta['last_date']})
+        X_train, y_train, X_forecast, X_test = _make_windows(feature_set, split, sc, lookback)
+        predicted_stock_price, error_lstm = _evaluate(model, sc, X_test, real_stock_price)
+    else:
+        warm = registry.latest(ticker) if (incremental and ticker and registry is not None) else None
+        if warm and registry.is_compatible(warm[2], lookback, features):
+            model, sc, meta = warm
+            X_train, y_train, X_forecast, X_test = _make_windows(feature_set, split, sc, lookback)
+            
+            # Only the windows whose target bar is newer than the stored model's data
+            target_dates = pd.to_datetime(df['Date']).values[lookback:]
+            new_windows = target_dates > np.datetime64(meta['last_date'])
+            if new_windows.any():
+                with model_duration.time(model='lstm', phase='fine_tune'):
+                    model.fit(X_train[new_windows], y_train[new_windows], epochs=FINE_TUNE_EPOCHS, batch_size=32, callbacks=callbacks)
+                predicted_stock_price, error_lstm = _evaluate(model, sc, X_test, real_stock_price)
+                baseline_rmse = meta.get('rmse')
+                within_tolerance = baseline_rmse is None or error_lstm <= baseline_rmse * (1 + FINE_TUNE_TOLERANCE)
+                report = {
+                    'mode': 'incremental',
+                    'new_windows': int(new_windows.sum()),
+                    'baseline_rmse': baseline_rmse,
+                    'rmse': error_lstm,
+                    'within_tolerance': bool(within_tolerance),
+                }
+                logger.info("Fine-tuned stored model", extra={'ticker': ticker, **report})
+                if not within_tolerance:
+                    # Fine-tuning drifted too far, start over from scratch
+                    model = None
+                    report['mode'] = 'full'
+            else:
+                model = None
+        
+        if model is None:
+            # Feature Scaling
+            sc = MinMaxScaler(feature_range=(0, 1))
+            sc.fit(feature_set)
+            X_train, y_train, X_forecast, X_test = _make_windows(feature_set, split, sc, lookback)
+            
+            # Building the LSTM model
+            model = build_lstm_model(lookback, len(features))
+            
+            # Train the model
+            with model_duration.time(model='lstm', phase='train'):
+                model.fit(X_train, y_train, epochs=25, batch_size=32, callbacks=callbacks)
+            predicted_stock_price, error_lstm = _evaluate(model, sc, X_test, real_stock_price)
     
     # Forecasting Prediction
-    forecasted_stock_price = model.predict(X_forecast)
-    forecasted_stock_price = sc.inverse_transform(forecasted_stock_price)
+    with model_duration.time(model='lstm', phase='infer'):
+        forecasted_stock_price = _inverse_target(sc, model.predict(X_forecast))
     
     lstm_pred = forecasted_stock_price[0, 0]
     
     # Creating DataFrame with Actual vs. Predicted values
-    df2_test = df2[len(df2) - len(test_data):].values  # Adjust 'Volume' column for test data
+    df2_test = df2[split:].values  # Adjust 'Volume' column for test data
     
     # Creating DataFrame with Actual vs. Predicted values
     df1 = pd.DataFrame({
-        "Actual Data": np.array(real_stock_price).flatten(),
-        "Predicted": np.array(predicted_stock_price).flatten(),
+        "Actual Data": real_stock_price.flatten(),
+        "Predicted": predicted_stock_price.flatten(),
         
     })
     
-    print("Training set shape:", X_train.shape)
-    print("Test set shape:", X_test.shape)
-    print("Actual stock price shape:", real_stock_price.shape)
-    print("Predicted stock price shape:", predicted_stock_price.shape)
-    print("Forecasted stock price:", lstm_pred)
-    print("Error (RMSE):", error_lstm)
-    
     # Calculate MAPE and Model Accuracy
     mape = np.mean(np.abs((real_stock_price - predicted_stock_price) / real_stock_price)) * 100
     accuracy = 100 - mape
-    print(f"MAPE: {mape:.2f}%")
-    print(f"Model Accuracy: {accuracy:.2f}%")
+    logger.debug("LSTM evaluated", extra={
+        'ticker': ticker, 'mode': report['mode'], 'train_windows': len(X_train), 'test_windows': len(X_test),
+        'forecast': float(lstm_pred), 'rmse': float(error_lstm), 'mape': float(mape), 'accuracy': float(accuracy),
+    })
+    
+    if store and registry is not None and report['mode'] != 'cached':
+        meta = registry.save(ticker, df, model, sc, lookback, features=features,
+                             rmse=error_lstm, mape=float(mape), mode=report['mode'])
+        report['fingerprint'] = meta['fingerprint']
     
     # Returning values
+    if return_report:
+        return lstm_pred, error_lstm, df1, df2_test, report
     return lstm_pred, error_lstm, df1, df2_test
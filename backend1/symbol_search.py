@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import bisect
+import threading
+from collections import Counter, defaultdict
+
+# Typeahead search over the NSE code list (the same Codelist2.json the frontend
+# ships). The list is loaded once into sorted key arrays for prefix lookups by
+# bisection, a trigram index for substring matches and a bigram index over the
+# distinct words for typo-tolerant matches, so a query touches only the entries
+# that can match. Results are ranked by how they matched, then by their order in
+# the list (which puts the large caps first).
+SYMBOL_LIST_PATH = os.environ.get('SYMBOL_LIST_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'frontend1', 'public', 'Codelist2.json'))
+SYMBOL_LIST_KEY = 'NSE - Yahoo Code '
+
+# Minimum bigram Dice similarity for a word to count as a fuzzy match
+FUZZY_MIN_SIMILARITY = float(os.environ.get('FUZZY_MIN_SIMILARITY', 0.5))
+# Shorter query words are only matched by prefix/substring
+FUZZY_MIN_LENGTH = 3
+
+# Match kinds, best first
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, SUBSTRING, FUZZY = range(5)
+MATCH_NAMES = ('exact', 'symbol_prefix', 'name_prefix', 'substring', 'fuzzy')
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def _compact(text):
+    """ Lowercase with punctuation dropped, so 'M&M' and 'mm' or 'BAJAJ-AUTO' and 'bajajauto' compare equal. """
+    return ''.join(_WORD.findall(text.lower()))
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SymbolIndex:
+    def __init__(self, entries):
+        """ `entries`: [(nse_symbol, security_name)] in display-priority order. """
+        self.entries = list(entries)
+        self._haystacks = [f"{symbol}\n{name}".lower() for symbol, name in self.entries]
+
+        # Compact symbols, sorted, for exact and prefix lookups
+        symbol_keys = sorted((_compact(symbol), i) for i, (symbol, _) in enumerate(self.entries))
+        self._symbol_keys = [key for key, _ in symbol_keys]
+        self._symbol_ids = [i for _, i in symbol_keys]
+
+        # Every word of every name (and the symbol itself), sorted, for word-prefix lookups
+        word_ids = defaultdict(set)
+        for i, (symbol, name) in enumerate(self.entries):
+            for word in _WORD.findall(name.lower()) + [_compact(symbol)]:
+                word_ids[word].add(i)
+        self._words = sorted(word_ids)
+        self._word_ids = [word_ids[word] for word in self._words]
+
+        self._trigrams = defaultdict(set)
+        for i, haystack in enumerate(self._haystacks):
+            for gram in _ngrams(haystack, 3):
+                self._trigrams[gram].add(i)
+
+        self._word_bigrams = [_ngrams(word, 2) for word in self._words]
+        self._bigram_words = defaultdict(list)
+        for w, grams in enumerate(self._word_bigrams):
+            for gram in grams:
+                self._bigram_words[gram].append(w)
+
+    @classmethod
+    def from_file(cls, path=SYMBOL_LIST_PATH):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)[SYMBOL_LIST_KEY]
+        return cls((str(row['NSE Symbol']), str(row['Security Name'] or '')) for row in rows)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix_range(self, keys, prefix):
+        return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + '\uffff')
+
+    def _symbol_matches(self, compact):
+        lo, hi = self._prefix_range(self._symbol_keys, compact)
+        return {self._symbol_ids[k]: EXACT if self._symbol_keys[k] == compact else SYMBOL_PREFIX for k in range(lo, hi)}
+
+    def _words_with_prefix(self, prefix):
+        lo, hi = self._prefix_range(self._words, prefix)
+        return set().union(*self._word_ids[lo:hi]) if hi > lo else set()
+
+    def _substring_matches(self, text):
+        if len(text) < 3:
+            return {i for i, haystack in enumerate(self._haystacks) if text in haystack}
+        grams = sorted((self._trigrams.get(gram, set()) for gram in _ngrams(text, 3)), key=len)
+        candidates = set.intersection(*grams)
+        return {i for i in candidates if text in self._haystacks[i]}
+
+    def _fuzzy_word_scores(self, word):
+        """ {entry id: best similarity} of entries with a word close to `word`. """
+        grams = _ngrams(word, 2)
+        overlaps = Counter(w for gram in grams for w in self._bigram_words.get(gram, ()))
+        scores = {}
+        for w, overlap in overlaps.items():
+            similarity = 2 * overlap / (len(grams) + len(self._word_bigrams[w]))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                for i in self._word_ids[w]:
+                    scores[i] = max(scores.get(i, 0.0), similarity)
+        return scores
+
+    def search(self, query, limit=10, offset=0):
+        """
+        (total matches, [{'nseSymbol', 'companyName', 'match'}]) for the page of
+        `limit` results starting at `offset`, best first.
+        """
+        text = query.strip().lower()
+        words = _WORD.findall(text)
+        if not words:
+            return 0, []
+
+        # id -> (match kind, -similarity); the best kind per entry wins
+        ranked = {}
+
+        def add(ids, kind, score=1.0):
+            for i in ids:
+                if i not in ranked or (kind, -score) < ranked[i]:
+                    ranked[i] = (kind, -score)
+
+        for i, kind in self._symbol_matches(''.join(words)).items():
+            add((i,), kind)
+        # All words must prefix some word of the name ('tata mot' -> Tata Motors)
+        add(set.intersection(*(self._words_with_prefix(word) for word in words)), NAME_PREFIX)
+        add(self._substring_matches(text), SUBSTRING)
+        if all(len(word) >= FUZZY_MIN_LENGTH for word in words):
+            per_word = [self._fuzzy_word_scores(word) for word in words]
+            for i in set.intersection(*(set(scores) for scores in per_word)):
+                add((i,), FUZZY, sum(scores[i] for scores in per_word) / len(per_word))
+
+        order = sorted(ranked, key=lambda i: (ranked[i], i))
+        page = [
+            {'nseSymbol': self.entries[i][0], 'companyName': self.entries[i][1], 'match': MATCH_NAMES[ranked[i][0]]}
+            for i in order[offset:offset + limit]
+        ]
+        return len(order), page
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """ The index over SYMBOL_LIST_PATH, built on first use. """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SymbolIndex.from_file()
+    return _index
+
+
+def search_symbols(query, limit=10, offset=0):
+    return get_index().search(query, limit=limit, offset=offset)
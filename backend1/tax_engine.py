@@ -0,0 +1,255 @@
+import io
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Capital-gains tax for Indian equity. Besides the original matched buy/sell pairs,
+# raw trade streams are FIFO-matched per symbol without a Python loop over trades:
+# buys and sells become intervals on a cumulative-quantity axis, and each matched
+# lot is one segment between consecutive interval end points. Symbols are laid
+# side by side on that axis, so the whole upload is matched in one sort and a
+# few searchsorted calls.
+
+# Sample Tax Rules (India-based)
+TAX_RULES = {
+    "short_term": 0.20,  # 20% tax for short-term gains
+    "long_term": 0.125,  # 12.5% tax for long-term gains
+}
+
+# Holdings up to this many days are short-term
+SHORT_TERM_DAYS = 365
+
+# Short-term gains up to this amount are exempt
+SHORT_TERM_EXEMPTION = 125000
+
+PAIR_COLUMNS = ["symbol", "buy_price", "sell_price", "quantity", "buy_date", "sell_date"]
+TRADE_COLUMNS = ["symbol", "side", "quantity", "price", "date"]
+
+# Common broker export headers -> our column names
+COLUMN_ALIASES = {
+    "ticker": "symbol",
+    "stock": "symbol",
+    "type": "side",
+    "trade_type": "side",
+    "action": "side",
+    "qty": "quantity",
+    "shares": "quantity",
+    "rate": "price",
+    "trade_price": "price",
+    "trade_date": "date",
+    "timestamp": "date",
+}
+
+SIDE_ALIASES = {"b": "buy", "buy": "buy", "s": "sell", "sell": "sell"}
+
+
+def categorize(buy_dates, sell_dates):
+    """ 'short_term' / 'long_term' for each holding period, as an array. """
+    holding_days = (sell_dates - buy_dates).dt.days.to_numpy()
+    return np.where(holding_days <= SHORT_TERM_DAYS, "short_term", "long_term")
+
+
+def tax_on_gains(gains, categories):
+    """ Tax per gain under TAX_RULES; losses and exempt short-term gains owe nothing. """
+    gains = np.asarray(gains, dtype=float)
+    rates = np.where(categories == "short_term", TAX_RULES["short_term"], TAX_RULES["long_term"])
+    exempt = (categories == "short_term") & (gains <= SHORT_TERM_EXEMPTION)
+    return np.where(exempt | (gains <= 0), 0.0, gains * rates)
+
+
+def tax_per_sale(lots):
+    """
+    Tax per matched lot, with the short-term exemption applied once per sale:
+    the lots of one sell row are taxed on their combined gain per category, and
+    that tax is split over them in proportion to their (positive) gains.
+    """
+    sale = [lots["sell_row"], lots["tax_category"]]
+    categories = lots["tax_category"].to_numpy()
+    sale_tax = tax_on_gains(lots["gain"].groupby(sale).transform("sum").to_numpy(), categories)
+    positive = lots["gain"].clip(lower=0)
+    positive_total = positive.groupby(sale).transform("sum").to_numpy()
+    share = np.divide(positive.to_numpy(), positive_total, out=np.zeros(len(lots)), where=positive_total > 0)
+    return sale_tax * share
+
+
+def _invalid_rows(df, numeric, dates, required):
+    """ Coerce columns in place; return a mask of rows that are missing or malformed. """
+    invalid = df[required].isna().any(axis=1)
+    for column in numeric:
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+        invalid |= df[column].isna()
+    for column in dates:
+        df[column] = pd.to_datetime(df[column], errors="coerce")
+        invalid |= df[column].isna()
+    return invalid
+
+
+def calculate_tax(portfolio):
+    """
+    Calculate the total tax liability and a breakdown of taxes for each transaction,
+    where each transaction is an already matched buy/sell pair.
+    """
+    df = pd.DataFrame(portfolio).reindex(columns=PAIR_COLUMNS)
+    invalid = _invalid_rows(df, ["buy_price", "sell_price", "quantity"], ["buy_date", "sell_date"], PAIR_COLUMNS)
+    for index in np.flatnonzero(invalid.to_numpy()):
+        logger.error("Error processing transaction: %s. Error: Invalid transaction data", portfolio[index])
+    df = df[~invalid]
+
+    categories = categorize(df["buy_date"], df["sell_date"])
+    gains = ((df["sell_price"] - df["buy_price"]) * df["quantity"]).to_numpy()
+    taxes = tax_on_gains(gains, categories)
+
+    breakdown = [
+        {"symbol": symbol, "gain": gain, "tax_category": category, "tax_amount": tax}
+        for symbol, gain, category, tax in zip(df["symbol"].tolist(), gains.tolist(), categories.tolist(), taxes.tolist())
+    ]
+    return float(taxes.sum()), breakdown
+
+
+def read_trades(data, filename=None):
+    """
+    Trades from an uploaded CSV or JSON file (bytes/str) or an already parsed list
+    of dicts, with columns normalised to TRADE_COLUMNS.
+    """
+    if isinstance(data, (bytes, str)):
+        text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+        if (filename or "").lower().endswith(".json") or text.lstrip()[:1] in ("[", "{"):
+            parsed = json.loads(text)
+            df = pd.DataFrame(parsed.get("trades", []) if isinstance(parsed, dict) else parsed)
+        elif not text.strip():
+            df = pd.DataFrame()
+        else:
+            df = pd.read_csv(io.StringIO(text))
+    else:
+        df = pd.DataFrame(data)
+
+    # Nothing uploaded: no rows to check the columns of
+    if df.empty and not len(df.columns):
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    df = df.rename(columns=COLUMN_ALIASES)
+    missing = [c for c in TRADE_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing trade columns: {', '.join(missing)}")
+    return df[TRADE_COLUMNS]
+
+
+def match_trades(trades):
+    """
+    FIFO-match buys to sells per symbol.
+
+    Returns (lots, open_positions, errors): one lot per (buy, sell) pairing with
+    its quantity, dates, prices, gain, category and tax; the unsold remainder of
+    each buy; and the rows that couldn't be used, with the reason. A sell is
+    only matched against buys dated on or before it; any quantity sold beyond
+    the holdings at that date is reported in `errors`. Trades on the same date
+    keep their upload order, with buys ahead of sells. The short-term exemption
+    applies once per sell transaction, not per lot (see tax_per_sale).
+    """
+    df = trades.reset_index(drop=True).copy()
+    df["row"] = df.index
+    df["symbol"] = df["symbol"].where(df["symbol"].isna(), df["symbol"].astype(str).str.strip().str.upper())
+    df["side"] = df["side"].astype(str).str.strip().str.lower().map(SIDE_ALIASES)
+
+    invalid = _invalid_rows(df, ["quantity", "price"], ["date"], TRADE_COLUMNS)
+    invalid |= (df["quantity"] <= 0) | (df["price"] < 0)
+    errors = [{"row": int(row), "error": "Invalid trade data"} for row in df.loc[invalid, "row"]]
+    # Same-day buys come before sells, so a position can be opened and closed on one day
+    df["is_sell"] = df["side"] == "sell"
+    df = df[~invalid].sort_values(["symbol", "date", "is_sell"], kind="stable")
+
+    symbol = df["symbol"]
+    bought = df["quantity"].where(~df["is_sell"], 0.0).groupby(symbol).cumsum()
+    sold = df["quantity"].where(df["is_sell"], 0.0).groupby(symbol).cumsum()
+    # A sell can only consume what was bought up to its date. The running maximum
+    # of sold - bought is how much has been sold beyond holdings so far; that
+    # excess is dropped, so later buys aren't matched to earlier sells.
+    oversold = (sold - bought).groupby(symbol).cummax().clip(lower=0).round(9)
+    excess = (oversold - oversold.groupby(symbol).shift(fill_value=0.0)).round(9)
+    matched_sold = sold - oversold
+
+    short = df[excess > 0]
+    for row, name, date, quantity in zip(short["row"], short["symbol"], short["date"], excess[excess > 0]):
+        errors.append({
+            "row": int(row),
+            "symbol": name,
+            "error": f"Sold {quantity:g} more than held on {date:%Y-%m-%d}; the excess was not matched",
+        })
+
+    is_sell = df["is_sell"].to_numpy()
+    buys = df[~is_sell]
+    sells = df[is_sell]
+    buy_total = bought.groupby(symbol).last()
+    sell_total = matched_sold.groupby(symbol).last()
+    symbols = buy_total.index
+
+    # Each symbol gets its own stretch of the quantity axis
+    span = buy_total
+    offset = span.cumsum() - span
+    matched_until = offset + sell_total
+
+    # Interval ends are rounded so fractional quantities don't leave float-noise slivers
+    buy_end = np.round(offset[buys["symbol"]].to_numpy() + bought[~is_sell].to_numpy(), 9)
+    sell_end = np.round(offset[sells["symbol"]].to_numpy() + matched_sold[is_sell].to_numpy(), 9)
+    offset, symbol_end, matched_until = offset.round(9), (offset + span).round(9), matched_until.round(9)
+
+    # Every lot boundary is the end of some buy or sell, or a symbol's matched limit
+    points = np.unique(np.concatenate([offset.to_numpy(), matched_until.to_numpy(), buy_end, sell_end]))
+    starts, ends = points[:-1], points[1:]
+    symbol_index = np.searchsorted(symbol_end.to_numpy(), starts, side="right")
+    in_range = symbol_index < len(symbols)
+    in_range[in_range] &= starts[in_range] < matched_until.to_numpy()[symbol_index[in_range]]
+    starts, ends = starts[in_range], ends[in_range]
+
+    buy_rows = buys.iloc[np.searchsorted(buy_end, starts, side="right")]
+    sell_rows = sells.iloc[np.searchsorted(sell_end, starts, side="right")]
+    quantity = ends - starts
+
+    categories = categorize(buy_rows["date"].reset_index(drop=True), sell_rows["date"].reset_index(drop=True))
+    gains = (sell_rows["price"].to_numpy() - buy_rows["price"].to_numpy()) * quantity
+    lots = pd.DataFrame({
+        "symbol": buy_rows["symbol"].to_numpy(),
+        "quantity": quantity,
+        "buy_row": buy_rows["row"].to_numpy(),
+        "sell_row": sell_rows["row"].to_numpy(),
+        "buy_date": buy_rows["date"].to_numpy(),
+        "sell_date": sell_rows["date"].to_numpy(),
+        "buy_price": buy_rows["price"].to_numpy(),
+        "sell_price": sell_rows["price"].to_numpy(),
+        "gain": gains,
+        "tax_category": categories,
+    })
+    # A sale split over several buy lots still gets the exemption only once
+    lots["tax_amount"] = tax_per_sale(lots)
+
+    # Whatever part of each buy lies beyond its symbol's matched limit is still held
+    limit = matched_until[buys["symbol"]].to_numpy()
+    remaining = np.round(buy_end - np.maximum(buy_end - buys["quantity"].to_numpy(), limit), 9)
+    held = remaining > 0
+    open_positions = pd.DataFrame({
+        "symbol": buys["symbol"].to_numpy()[held],
+        "row": buys["row"].to_numpy()[held],
+        "date": buys["date"].to_numpy()[held],
+        "price": buys["price"].to_numpy()[held],
+        "quantity": remaining[held],
+    })
+    return lots, open_positions, errors
+
+
+def summarize(lots):
+    """ Gains and tax per symbol and category, plus the overall total. """
+    summary = (lots.groupby(["symbol", "tax_category"], sort=True)
+               .agg(quantity=("quantity", "sum"), gain=("gain", "sum"), tax_amount=("tax_amount", "sum"))
+               .reset_index())
+    return float(lots["tax_amount"].sum()), summary
+
+
+def frame_records(df, date_columns=()):
+    """ JSON-ready records with dates as YYYY-MM-DD strings. """
+    df = df.copy()
+    for column in date_columns:
+        df[column] = df[column].dt.strftime("%Y-%m-%d")
+    return df.to_dict(orient="records")
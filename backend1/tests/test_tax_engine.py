@@ -0,0 +1,139 @@
+import random
+from collections import defaultdict, deque
+import pandas as pd
+import pytest
+from tax_engine import TAX_RULES, match_trades, read_trades
+
+
+def trades(*rows):
+    return pd.DataFrame(rows, columns=["symbol", "side", "quantity", "price", "date"])
+
+
+def reference_fifo(df):
+    """ Plain per-trade FIFO: (sorted lots, sorted open positions, oversold quantity per symbol). """
+    df = df.reset_index(drop=True).assign(row=lambda d: d.index, date=lambda d: pd.to_datetime(d["date"]))
+    df = df.assign(is_sell=df["side"] == "sell").sort_values(["symbol", "date", "is_sell"], kind="stable")
+    queues = defaultdict(deque)
+    lots, oversold = [], defaultdict(float)
+    for t in df.itertuples():
+        if not t.is_sell:
+            queues[t.symbol].append([t.row, t.quantity])
+            continue
+        left = t.quantity
+        while left > 1e-9 and queues[t.symbol]:
+            lot = queues[t.symbol][0]
+            take = min(lot[1], left)
+            lots.append((t.symbol, lot[0], t.row, round(take, 6)))
+            lot[1] -= take
+            left -= take
+            if lot[1] <= 1e-9:
+                queues[t.symbol].popleft()
+        if left > 1e-9:
+            oversold[t.symbol] += left
+    held = [(s, row, round(q, 6)) for s, queue in queues.items() for row, q in queue if q > 1e-9]
+    return sorted(lots), sorted(held), {s: round(q, 6) for s, q in oversold.items()}
+
+
+def normalise(lots, open_positions, errors):
+    got_lots = sorted(zip(lots["symbol"], lots["buy_row"], lots["sell_row"], lots["quantity"].round(6)))
+    got_held = sorted(zip(open_positions["symbol"], open_positions["row"], open_positions["quantity"].round(6)))
+    got_oversold = defaultdict(float)
+    for error in errors:
+        got_oversold[error["symbol"]] += float(error["error"].split()[1])
+    return got_lots, got_held, {s: round(q, 6) for s, q in got_oversold.items()}
+
+
+def test_partial_fills_across_buys():
+    lots, open_positions, errors = match_trades(trades(
+        ("X", "buy", 10, 100, "2023-01-01"),
+        ("X", "buy", 10, 120, "2023-02-01"),
+        ("X", "sell", 15, 150, "2024-06-01"),
+    ))
+    assert errors == []
+    assert lots[["buy_row", "sell_row", "quantity"]].values.tolist() == [[0, 2, 10], [1, 2, 5]]
+    assert lots["gain"].tolist() == [500, 150]
+    assert lots["tax_category"].tolist() == ["long_term", "long_term"]
+    assert open_positions[["row", "quantity"]].values.tolist() == [[1, 5]]
+
+
+def test_sell_is_not_matched_to_a_later_buy():
+    lots, open_positions, errors = match_trades(trades(
+        ("X", "sell", 10, 200, "2024-01-01"),
+        ("X", "buy", 10, 100, "2024-06-01"),
+    ))
+    assert lots.empty
+    assert open_positions[["row", "quantity"]].values.tolist() == [[1, 10]]
+    assert [(e["row"], e["symbol"]) for e in errors] == [(0, "X")]
+
+
+def test_excess_sell_does_not_consume_later_buys():
+    lots, open_positions, errors = match_trades(trades(
+        ("X", "buy", 5, 100, "2024-01-01"),
+        ("X", "sell", 8, 110, "2024-02-01"),
+        ("X", "buy", 4, 90, "2024-03-01"),
+        ("X", "sell", 4, 95, "2024-04-01"),
+    ))
+    assert lots[["buy_row", "sell_row", "quantity"]].values.tolist() == [[0, 1, 5], [2, 3, 4]]
+    assert (lots["buy_date"] <= lots["sell_date"]).all()
+    assert open_positions.empty
+    assert len(errors) == 1 and errors[0]["row"] == 1 and errors[0]["error"].startswith("Sold 3 more")
+
+
+def test_same_day_buy_is_available_to_sell():
+    lots, _, errors = match_trades(trades(
+        ("X", "sell", 3, 105, "2024-01-01"),
+        ("X", "buy", 3, 100, "2024-01-01"),
+    ))
+    assert errors == []
+    assert lots[["buy_row", "sell_row", "quantity"]].values.tolist() == [[1, 0, 3]]
+
+
+def test_invalid_rows_are_reported():
+    lots, _, errors = match_trades(trades(
+        ("X", "buy", 10, 100, "2024-01-01"),
+        ("X", "sell", -1, 100, "2024-02-01"),
+        ("X", "hold", 1, 100, "2024-02-01"),
+        ("X", "sell", 2, 100, "not a date"),
+    ))
+    assert lots.empty
+    assert sorted(e["row"] for e in errors) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_reference_fifo(seed):
+    rng = random.Random(seed)
+    rows = [
+        (rng.choice("ABC"), rng.choice(["buy", "sell"]), rng.choice([1, 2.5, 3, 10, 0.1]),
+         rng.randint(50, 150), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+        for _ in range(rng.randint(1, 25))
+    ]
+    df = trades(*rows)
+    lots, open_positions, errors = match_trades(df)
+    assert normalise(lots, open_positions, errors) == reference_fifo(df)
+    assert (lots["sell_date"] >= lots["buy_date"]).all()
+
+
+def test_exemption_applies_once_per_sale():
+    lots, _, _ = match_trades(trades(
+        ("X", "buy", 100, 100, "2024-01-01"),
+        ("X", "buy", 100, 100, "2024-01-02"),
+        ("X", "sell", 200, 1100, "2024-06-01"),
+    ))
+    # Each lot gains 1 lakh (under the exemption), but the sale gains 2 lakh
+    assert lots["gain"].tolist() == [100000, 100000]
+    assert lots["tax_amount"].sum() == pytest.approx(200000 * TAX_RULES["short_term"])
+
+
+def test_exemption_nets_lots_of_one_sale():
+    lots, _, _ = match_trades(trades(
+        ("X", "buy", 100, 100, "2024-01-01"),
+        ("X", "buy", 100, 3000, "2024-01-02"),
+        ("X", "sell", 200, 2000, "2024-06-01"),
+    ))
+    # The second lot's loss offsets the first lot's gain within the sale
+    assert lots["tax_amount"].tolist() == [0, 0]
+
+
+def test_empty_upload_has_no_trades():
+    for data in ([], b"", "  \n"):
+        assert read_trades(data).empty
@@ -0,0 +1,37 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Sliding-window helpers for the sequence models. Windows are strided views over
+# the input array, so building them copies nothing regardless of the lookback.
+
+# TO PREDICT STOCK PRICES OF NEXT N DAYS, STORE PREVIOUS N DAYS IN MEMORY WHILE TRAINING
+LOOKBACK = 7
+# Input columns; the first one is the value being forecast
+FEATURES = ('Close',)
+
+
+def sliding_windows(values, lookback):
+    """
+    All windows of `lookback` consecutive rows of `values` (n rows, optionally
+    several feature columns), shaped (n - lookback + 1, lookback, features).
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    if len(values) < lookback:
+        raise ValueError(f"Need at least {lookback} rows to build windows, got {len(values)}")
+    # sliding_window_view puts the window axis last: (windows, features, lookback)
+    return sliding_window_view(values, lookback, axis=0).transpose(0, 2, 1)
+
+
+def make_supervised(values, lookback, target_col=0):
+    """
+    Split `values` into model inputs and targets: X[i] holds rows i..i+lookback-1
+    and y[i] is row i+lookback of `target_col`. Also returns the final window
+    (the last `lookback` rows), which is the input for forecasting the next step.
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    windows = sliding_windows(values, lookback)
+    return windows[:-1], values[lookback:, target_col], windows[-1:]
@@ -29,10 +29,24 @@ const HomePage = () => {
   const [error, setError] = useState(null);
 
   useEffect(() => {
+    let source;
     const fetchPrices = async () => {
       try {
         const response = await axios.get('http://localhost:5000/latest-prices');
         setPrices(response.data);
+
+        // Live updates (opt-in with REACT_APP_LIVE_QUOTES=true, which needs the threaded
+        // gunicorn config): the server pushes only the indices whose prices changed
+        if (process.env.REACT_APP_LIVE_QUOTES === 'true') {
+          const indices = encodeURIComponent(Object.keys(response.data).join(','));
+          source = new EventSource(`http://localhost:5000/stream/quotes?indices=${indices}`);
+          source.onmessage = (event) => {
+            const { index } = JSON.parse(event.data);
+            if (index) setPrices((prev) => ({ ...prev, ...index }));
+          };
+          // Refused (too many streams) or dropped: keep the prices already shown instead of retrying
+          source.onerror = () => source.close();
+        }
       } catch (err) {
         setError('Error fetching data');
         console.error(err);
@@ -41,6 +55,7 @@ const HomePage = () => {
       }
     };
     fetchPrices();
+    return () => source && source.close();
   }, []);
 
   const getPriceColor = (change) => {
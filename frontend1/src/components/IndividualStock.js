@@ -20,32 +20,6 @@ import 'react-resizable/css/styles.css';
 
 
 
-// Function to calculate moving average
-const calculateMovingAverage = (data, windowSize) => {
-  console.log("Input Data for Moving Average:", data);
-  console.log("Window Size:", windowSize);
-
-  if (!data || data.length < windowSize) {
-    console.warn("Insufficient data for moving average calculation");
-    return Array(data.length).fill(null);
-  }
-
-  const movingAverages = [];
-  for (let i = windowSize - 1; i < data.length; i++) {
-    const windowData = data.slice(i - windowSize + 1, i + 1);
-    const sum = windowData.reduce((acc, item) => acc + item, 0);
-    const average = sum / windowSize;
-    movingAverages.push(average);
-  }
-
-  console.log(`Calculated ${windowSize}-Day Moving Average:`, movingAverages);
-  return Array(windowSize - 1).fill(null).concat(movingAverages);
-};
-
-
-
-
-
 const IndividualStockData = () => {
   const [isMinimized, setIsMinimized] = useState(false)
   const [tabIndex, setTabIndex] = useState(0);
@@ -116,22 +90,29 @@ const IndividualStockData = () => {
     setError(null);
   
     try {
-      const response = await axios.get(`http://localhost:5000/stock-data`, {
-        params: { ticker, start_date: startDate, end_date: endDate },
-      });
-  
-      const stockData = response.data;
-      const closePrices =stockData?.map((item) => extractValue(item, 'Close'))
-  
-      // Calculate moving averages
-      const ma100 = calculateMovingAverage(closePrices, 100);
-      const ma200 = calculateMovingAverage(closePrices, 200);
+      // Moving averages come from the backend, which warms them up on the bars before startDate.
+      // They are settled separately, so the price chart still loads when /indicators fails.
+      const [response, indicators] = await Promise.allSettled([
+        axios.get(`http://localhost:5000/stock-data`, {
+          params: { ticker, start_date: startDate, end_date: endDate },
+        }),
+        axios.get(`http://localhost:5000/indicators`, {
+          params: { ticker, start_date: startDate, end_date: endDate, indicators: "sma:100,sma:200" },
+        }),
+      ]);
+      if (response.status === "rejected") throw response.reason;
   
-      console.log("Fetched Stock Data:", stockData);
-      console.log("100-Day Moving Average:", ma100);
-      console.log("200-Day Moving Average:", ma200);
+      const stockData = response.value.data;
+      let maDates = [], ma100 = [], ma200 = [];
+      if (indicators.status === "fulfilled") {
+        maDates = indicators.value.data.dates.map((date) => new Date(date).toLocaleDateString("en-GB"));
+        ma100 = indicators.value.data.indicators.sma_100?.sma ?? [];
+        ma200 = indicators.value.data.indicators.sma_200?.sma ?? [];
+      } else {
+        console.error("Error fetching moving averages:", indicators.reason);
+      }
   
-      setData({ stockData, ma100, ma200, fetchForTab });
+      setData({ stockData, maDates, ma100, ma200, fetchForTab });
     } catch (error) {
       setError("Error fetching data. Please try again.");
       console.error("Error fetching stock data:", error);
@@ -175,16 +156,16 @@ const IndividualStockData = () => {
     {
       type: "scatter",
       mode: "lines",
-      x: data.stockData?.slice(99).map(extractDate), // Dates for 100-Day MA (start from 100th index)
-      y: data.ma100?.slice(99), // 100-Day Moving Average (start from 100th index)
+      x: data.maDates, // Dates for 100-Day MA; null values before enough history are not drawn
+      y: data.ma100, // 100-Day Moving Average
       name: "100-Day Moving Average",
       line: { color: "orange" },
     },
     {
       type: "scatter",
       mode: "lines",
-      x: data.stockData?.slice(199).map(extractDate), // Dates for 200-Day MA (start from 200th index)
-      y: data.ma200?.slice(199), // 200-Day Moving Average (start from 200th index)
+      x: data.maDates, // Dates for 200-Day MA
+      y: data.ma200, // 200-Day Moving Average
       name: "200-Day Moving Average",
       line: { color: "purple" },
     },
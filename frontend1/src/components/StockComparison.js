@@ -58,39 +58,25 @@ const StockComparison = () => {
     setLoading(true);
     setError(null);
     try {
-      const response1 = await axios.get(`http://localhost:5000/stock-data`, {
-        params: { ticker: ticker1, start_date: startDate, end_date: endDate },
-      });
-      const response2 = await axios.get(`http://localhost:5000/stock-data`, {
-        params: { ticker: ticker2, start_date: startDate, end_date: endDate },
-      });
-      const response3 = await axios.get(`http://localhost:5000/stock-data`, {
-        params: { ticker: ticker3, start_date: startDate, end_date: endDate },
+      // One request for all three tickers, aligned on their common dates
+      const response = await axios.get(`http://localhost:5000/stock-data-batch`, {
+        params: { tickers: [ticker1, ticker2, ticker3].join(","), start_date: startDate, end_date: endDate },
       });
+      const { dates, series } = response.data;
 
-      // Transform the data into a usable format
-      const transformData = (data) => {
-        return data.map((item) => {
-          const transformedItem = {};
-          Object.entries(item).forEach(([key, value]) => {
-            const [field, ticker] = key.split(", "); // Split the key into field and ticker
-            transformedItem[field.replace(/[()']/g, "")] = value; // Remove unwanted characters
+      // Turn each ticker's column arrays back into one record per date
+      const toRecords = (columns) =>
+        dates.map((date, i) => {
+          const item = { Date: Date.parse(date) };
+          Object.entries(columns).forEach(([field, values]) => {
+            item[field] = values[i];
           });
-          return transformedItem;
+          return item;
         });
-      };
 
-      setData({
-        [ticker1]: transformData(response1.data),
-        [ticker2]: transformData(response2.data),
-        [ticker3]: transformData(response3.data),
-      });
-
-      console.log("Transformed Data:", {
-        [ticker1]: transformData(response1.data),
-        [ticker2]: transformData(response2.data),
-        [ticker3]: transformData(response3.data),
-      });
+      setData(
+        Object.fromEntries(Object.entries(series).map(([ticker, columns]) => [ticker, toRecords(columns)]))
+      );
     } catch (error) {
       console.error("Error fetching stock data:", error);
       setError("Error fetching stock data. Please try again.");
@@ -25,7 +25,7 @@ function StockPrediction() {
         try {
             const stockData = await fetchStockData(ticker);
             if (stockData) {
-                const response = await axios.post(`http://localhost:5000/predict`, { stockData });
+                const response = await axios.post(`http://localhost:5000/predict`, { stockData, ticker });
                 console.log('Prediction Response:', response.data);
                 setPredictionData(response.data);
             } else {
@@ -5,7 +5,6 @@ import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faTimes } from '@fortawesome/free-solid-svg-icons';
 
 const Watchlist = () => {
-  const [nseData, setNseData] = useState([]);
   const [tickerInput, setTickerInput] = useState('');
   const [filteredSuggestions, setFilteredSuggestions] = useState([]);
   const [watchlists, setWatchlists] = useState([]); // Array to store multiple watchlists
@@ -17,40 +16,31 @@ const Watchlist = () => {
 
 
 
+  // Suggestions come from the backend's symbol index instead of scanning the whole code list here
   useEffect(() => {
-    const loadTickers = async () => {
+    const query = tickerInput.trim();
+    if (!query) {
+      setFilteredSuggestions([]);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
       try {
-        const response = await fetch('/CodeList2.json');
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
+        const response = await axios.get(`http://localhost:5000/search-symbols`, { params: { q: query, limit: 20 } });
+        if (!cancelled) {
+          setFilteredSuggestions(response.data.results.map(({ nseSymbol, companyName }) => ({ nseSymbol, companyName })));
         }
-        const data = await response.json();
-        const nseSymbols = data['NSE - Yahoo Code '] ? data['NSE - Yahoo Code '].map(row => ({
-          nseSymbol: row['NSE Symbol'],
-          companyName: row['Security Name'],
-        })) : [];
-        setNseData(nseSymbols);
       } catch (error) {
-        console.error('Error loading JSON file:', error);
+        console.error('Error searching symbols:', error);
       }
-    };
-
-    loadTickers();
-  }, []);
-
+    }, 150);
 
-
-  useEffect(() => {
-    if (tickerInput) {
-      const filtered = nseData.filter(item =>
-        item.nseSymbol.toLowerCase().includes(tickerInput.toLowerCase()) ||
-        item.companyName.toLowerCase().includes(tickerInput.toLowerCase())
-      );
-      setFilteredSuggestions(filtered);
-    } else {
-      setFilteredSuggestions([]);
-    }
-  }, [tickerInput, nseData]);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [tickerInput]);
 
   const handleInputChange = (e) => {
     setTickerInput(e.target.value);
@@ -62,36 +52,28 @@ const Watchlist = () => {
     if (isAuthenticated && user && user.id) {
       const fetchWatchlist = async () => {
         try {
-          // Step 1: Fetch the existing watchlist
-          const response = await axios.get(`http://localhost:5000/get-watchlist`, {
-            params: { userId: user.id }
-          });
+          // Step 1: Fetch the existing watchlists and refresh all their prices in one request
+          const [response, refreshResponse] = await Promise.all([
+            axios.get(`http://localhost:5000/get-watchlist`, {
+              params: { userId: user.id }
+            }),
+            axios.post(`http://localhost:5000/refresh-watchlist`, { userId: user.id }),
+          ]);
   
           const watchlistsData = response.data;
+          const prices = refreshResponse.data.prices || {};
   
           if (Array.isArray(watchlistsData)) {
-            // Step 2: Fetch updated stock prices for each stock in the watchlist
-            const updatedWatchlists = await Promise.all(
-              watchlistsData.map(async (list) => {
-                const updatedItems = await Promise.all(
-                  list.items.map(async (item) => {
-                    // Fetch updated stock price
-                    const stockData = await fetchStockData(item.Stock, item.stockName,item.Watchlist);
-                    return {
-                      ...item,
-                      companyName: item.stockName,
-                      currentPrice: stockData.currentPrice, 
-                      nseSymbol: item.Stock
-                    };
-                  })
-                );
-                
-                return {
-                  name: list.name,
-                  items: updatedItems
-                };
-              })
-            );
+            // Step 2: Put the refreshed price on each stock in the watchlists
+            const updatedWatchlists = watchlistsData.map((list) => ({
+              name: list.name,
+              items: list.items.map((item) => ({
+                ...item,
+                companyName: item.stockName,
+                currentPrice: (prices[item.Stock] && prices[item.Stock].current_price) || 'N/A',
+                nseSymbol: item.Stock
+              }))
+            }));
   
             // Step 3: Update the state with the updated watchlists
             setWatchlists(updatedWatchlists);